@@ -1,18 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, Response, stream_with_context
 from flask_wtf import FlaskForm
 from flask_wtf.csrf import CSRFProtect  # Only import CSRFProtect, not csrf
-from wtforms import StringField, TextAreaField
+from wtforms import StringField, TextAreaField, BooleanField
 from wtforms.validators import DataRequired, URL
 import uuid
 import json
+import hmac
+import hashlib
 import os
 import re
-from datetime import datetime
+import time
+import asyncio
+from datetime import datetime, timedelta
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from config import get_config
-from models import db, Job
-from utils.scraper import scrape_website, validate_url
-from utils.search import search_serpapi, deduplicate_results
+from models import db, Job, JobArtifact, JobEvent, SUMMARY_FIELDS, submission_fingerprint
+from utils.scraper import scrape_website, scrape_website_async, crawl_website, validate_url, configure_scraper
+from utils.search import search_many, search_many_async, configure_search_cache
+from utils.cache import get_cache_stats
+from utils.http_session import configure_http, get_http_stats
+from utils.agents import configure_llm_cache, get_llm_usage_stats, run_agent_with_openai, run_agent_with_openai_async
+from utils.live import create_channel, PartialOutputWriter
 from utils.workflow import WorkflowManager
+from utils.executor import JobExecutor
+from utils.pipeline import Stage, run_pipeline
+from utils.speculation import Branch, BranchCancelled, SpeculationBudget, estimate_tokens
+from utils.prompts import configure_prompts, render_prompt
+from utils.metrics import phase_metrics, get_phase_metrics
 
 app = Flask(__name__)
 app.config.from_object(get_config())
@@ -30,10 +45,48 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Initialize background job execution
+executor = JobExecutor(app)
+
+# Initialize the shared HTTP session and result caches
+configure_http(app.config)
+configure_search_cache(app.config)
+configure_llm_cache(app.config)
+configure_prompts(app.config)
+configure_scraper(app.config)
+
+# Live event channel for streaming job output to the browser
+live_channel = create_channel(app.config)
+
+# Speculative STRATEGY branches of all jobs, kept off the job executor's workers
+speculation_pool = ThreadPoolExecutor(max_workers=app.config.get('SPECULATIVE_STRATEGY_CONCURRENCY', 3),
+                                      thread_name_prefix='speculation')
+
+# Job statuses after which nothing more happens
+TERMINAL_STATUSES = ('completed', 'error')
+
+def admin_required(view):
+    """
+    Restrict an endpoint to callers sending `Authorization: Bearer <ADMIN_API_TOKEN>`
+    
+    Job IDs are the only thing that grants access to a job's pages, so
+    endpoints that list jobs or expose service stats are disabled unless a
+    token is configured.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config.get('ADMIN_API_TOKEN')
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not token or not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return jsonify({'error': 'Not authorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
 # Forms
 class ContentWorkflowForm(FlaskForm):
     website_url = StringField('Website URL', validators=[DataRequired(), URL()])
     keywords = TextAreaField('Search Keywords (one per line or comma-separated)', validators=[DataRequired()])
+    refresh = BooleanField('Run fresh research')
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -51,6 +104,11 @@ def index():
         app.logger.info("Form validated successfully")
         
         try:
+            # Reuse the research of a recent identical submission, unless asked not to
+            source = None
+            if not form.refresh.data:
+                source = find_reusable_job(form.website_url.data, form.keywords.data)
+            
             # Create a unique job ID
             job_id = str(uuid.uuid4())
             
@@ -63,8 +121,12 @@ def index():
             db.session.add(job)
             db.session.commit()
             
-            # Start the workflow process
-            process_workflow(job_id)
+            if source:
+                # Research and themes are already known; go straight to theme selection
+                reuse_research(job, source)
+            else:
+                # Start the workflow process in the background
+                executor.submit('process_workflow', job_id)
             
             return redirect(url_for('process_job', job_id=job_id))
             
@@ -86,15 +148,114 @@ def process_job(job_id):
         flash('Job not found', 'error')
         return redirect(url_for('index'))
     
-    return render_template('processing.html', job=job)
+    return render_template('processing.html', job=job, job_id=job_id)
 
 @app.route('/job-status/<job_id>', methods=['GET'])
 def job_status(job_id):
-    job = Job.get_by_id(job_id)
-    if not job:
+    """
+    Job status as a slim projection
+    
+    Returns the summary fields by default; `fields=a,b,c` selects others and
+    `view=full` returns the whole job. The `events` field holds the job's log
+    entries after `since=<seq>`, so pollers only fetch what is new. Supports
+    If-None-Match with 304 responses.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid since cursor'}), 400
+    
+    if request.args.get('view') == 'full':
+        job = Job.get_by_id(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        payload = job.to_dict()
+    else:
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        fields = fields or list(SUMMARY_FIELDS)
+        
+        payload = Job.get_status(job_id, fields)
+        if payload is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if 'events' in fields:
+            payload['events'] = [event.to_dict() for event in JobEvent.since(job_id, since, limit=500)]
+        
+        # Progress fields not stored as columns come from the job's live channel
+        missing = [f for f in fields if f not in payload]
+        if missing:
+            snapshot = live_snapshot(job_id)
+            for field in missing:
+                if field in snapshot:
+                    payload[field] = snapshot[field]
+    
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/job-status/<job_id>/updates', methods=['GET'])
+def job_status_updates(job_id):
+    """Long-poll for status deltas after the given cursor"""
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        timeout = min(float(request.args.get('timeout', 25)), 60)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or timeout'}), 400
+    
+    # Only touch the database for the first request of a client
+    if cursor == 0 and not Job.get_by_id(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    events = live_channel.read(job_id, cursor, timeout=timeout)
+    if events:
+        cursor = events[-1]['seq']
+    
+    return jsonify({
+        'cursor': cursor,
+        'events': [event for event in events if event['type'] == 'status']
+    })
+
+@app.route('/job-stream/<job_id>', methods=['GET'])
+def job_stream(job_id):
+    """
+    Server-Sent Events stream of a job's live output
+    
+    The stream sends an `end` event and closes once the job has completed or
+    failed. Each open stream holds a web worker thread, so serve the app with
+    the threaded workers configured in gunicorn.conf.py.
+    """
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('cursor', 0))
+    except ValueError:
+        cursor = 0
+    
+    status = Job.get_status(job_id, ['status'])
+    if status is None:
         return jsonify({'error': 'Job not found'}), 404
+    # The stream outlives the request's database work; release the connection now
+    db.session.close()
+    
+    def generate(cursor, finished):
+        # Close the stream periodically; EventSource reconnects with Last-Event-ID
+        deadline = time.monotonic() + app.config.get('LIVE_STREAM_MAX_SECONDS', 300)
+        yield "retry: 2000\n\n"
+        while time.monotonic() < deadline:
+            events = live_channel.read(job_id, cursor, timeout=0 if finished else 15)
+            for event in events:
+                cursor = event['seq']
+                yield f"id: {cursor}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                if event['type'] == 'status' and event.get('status') in TERMINAL_STATUSES:
+                    finished = True
+            if finished:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if not events:
+                yield ": keepalive\n\n"
     
-    return jsonify(job.to_dict())
+    return Response(stream_with_context(generate(cursor, status['status'] in TERMINAL_STATUSES)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/results/<job_id>', methods=['GET'])
 def results(job_id):
@@ -108,6 +269,76 @@ def results(job_id):
     
     return render_template('results.html', job=job)
 
+@app.route('/api/jobs', methods=['GET'])
+@admin_required
+def list_jobs():
+    """
+    Job history, newest first, as slim projections (admin only)
+    
+    Filters: `status=a,b`, `domain=<host or URL>`, and `created_after` /
+    `created_before` as ISO dates or datetimes. Pages are keyset-paginated:
+    pass the returned `next_cursor` as `cursor` to get the next page, and
+    `limit` to set the page size. `fields=a,b,c` selects other status fields.
+    """
+    try:
+        default_limit = app.config.get('JOB_LIST_PAGE_SIZE', 50)
+        limit = int(request.args.get('limit', default_limit))
+        limit = max(1, min(limit, app.config.get('JOB_LIST_MAX_PAGE_SIZE', 200)))
+        created_after = parse_datetime_arg('created_after')
+        created_before = parse_datetime_arg('created_before')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    statuses = [s.strip() for s in request.args.get('status', '').split(',') if s.strip()]
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    
+    try:
+        jobs, next_cursor = Job.list_page(
+            status=statuses,
+            domain=request.args.get('domain'),
+            created_after=created_after,
+            created_before=created_before,
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            fields=fields or None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'jobs': jobs, 'next_cursor': next_cursor})
+
+def parse_datetime_arg(name):
+    """Parse an optional ISO date/datetime query argument; raises ValueError if malformed."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+@app.route('/api/cache-stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    return jsonify(get_cache_stats())
+
+@app.route('/api/http-stats', methods=['GET'])
+@admin_required
+def http_stats():
+    return jsonify(get_http_stats())
+
+@app.route('/api/llm-usage', methods=['GET'])
+@admin_required
+def llm_usage():
+    """Token usage since startup, including prompt tokens served from the provider's prompt cache"""
+    return jsonify(get_llm_usage_stats())
+
+@app.route('/api/phase-metrics', methods=['GET'])
+@admin_required
+def phase_metrics_stats():
+    """Agent call latency and tokens by workflow phase and model, for tuning MODEL_ROUTES"""
+    return jsonify(get_phase_metrics())
+
 @app.route('/api/theme-selection/<job_id>', methods=['POST'])
 @csrf.exempt
 def theme_selection(job_id):
@@ -116,472 +347,1014 @@ def theme_selection(job_id):
         return jsonify({'error': 'Job not found'}), 404
     
     try:
-        data = request.get_json()
-        if not data or 'selected_themes' not in data:
+        data = request.get_json(silent=True)
+        try:
+            theme_number = int(data['theme_number'])
+        except (TypeError, KeyError, ValueError):
             return jsonify({'error': 'Invalid request data'}), 400
         
-        # Update workflow state with selected themes
-        current_state = job.workflow_state or {}
-        current_state['selected_themes'] = data['selected_themes']
-        job.update_workflow_state(current_state)
+        if not any(theme.get('number') == theme_number for theme in job.content_themes or []):
+            return jsonify({'error': f"No theme number {theme_number}"}), 400
         
-        # Continue workflow
-        continue_workflow_after_selection(job_id)
+        # Only one of several concurrent selections may continue the workflow
+        if not Job.claim(job_id, 'awaiting_selection', 'processing'):
+            return jsonify({'error': 'Job is not waiting for a theme selection'}), 409
         
-        return jsonify({'status': 'success'})
+        selected = select_theme(job, theme_number)
+        
+        # Continue workflow in the background
+        executor.submit('continue_workflow_after_selection', job_id)
+        
+        return jsonify({'status': 'success', 'theme': selected['title']})
         
     except Exception as e:
         app.logger.error(f"Error in theme selection: {str(e)}")
+        db.session.rollback()
         job.update_status('error', str(e))
         return jsonify({'error': str(e)}), 500
 
-def process_workflow(job_id):
-    """Process the content workflow for a job"""
-    job = Job.get_by_id(job_id)
+def select_theme(job, theme_number):
+    """
+    Record the user's theme choice and move the job on to the STRATEGY phase
+    
+    Returns:
+        dict: The selected theme, or None if the job has no theme with that number
+    """
+    themes = job.content_themes or []
+    if not any(theme.get('number') == theme_number for theme in themes):
+        return None
+    
+    # Themes are listed by number, which the analysis agent may not start at 1
+    ordered = sorted(themes, key=lambda theme: theme.get('number', 0))
+    position = [theme.get('number') for theme in ordered].index(theme_number) + 1
+    
+    workflow_manager = WorkflowManager()
+    workflow_manager.load_state(job.workflow_state)
+    selected = workflow_manager.process_theme_selection(position, ordered)  # To STRATEGY
+    
+    job.selected_theme = selected
+    save_workflow(job, workflow_manager)
+    update_job(job, current_phase=workflow_manager.current_phase, status='processing',
+               message=f"Selected theme: {selected['title']}")
+    return selected
+
+def get_website_content(url):
+    """Scrape the client site, crawling several pages when SCRAPE_MODE is 'crawl'"""
+    if app.config.get('SCRAPE_MODE') != 'crawl':
+        return scrape_website(url)
+    
+    return crawl_website(url, **crawl_settings())
+
+async def get_website_content_async(url):
+    """Async version of get_website_content(); crawls run on a worker thread"""
+    if app.config.get('SCRAPE_MODE') != 'crawl':
+        return await scrape_website_async(url)
+    
+    return await asyncio.to_thread(crawl_website, url, **crawl_settings())
+
+def crawl_settings():
+    """Crawler limits from the app config"""
+    return {
+        'max_pages': app.config.get('CRAWL_MAX_PAGES', 10),
+        'max_depth': app.config.get('CRAWL_MAX_DEPTH', 2),
+        'max_chars': app.config.get('MAX_WEBSITE_CONTENT_LENGTH', 20000),
+        'concurrency': app.config.get('CRAWL_CONCURRENCY', 4),
+        'rate_limit': app.config.get('CRAWL_RATE_LIMIT', 4),
+        'use_sitemap': app.config.get('CRAWL_USE_SITEMAP', True)
+    }
+
+def live_snapshot(job_id):
+    """Fold a job's published status deltas into its latest known state"""
+    state = {'messages': []}
+    for event in live_channel.read(job_id, 0):
+        if event['type'] != 'status':
+            continue
+        for name, value in event.items():
+            if name == 'message':
+                state['messages'].append(value)
+            elif name not in ('type', 'seq'):
+                state[name] = value
+    return state
+
+def update_job(job, message=None, **fields):
+    """
+    Apply status fields to a job and publish them as a delta on its live channel
+    
+    Changes are committed straight away. A message event claims its
+    sequence number with an UPDATE of the job row, so leaving it uncommitted
+    would hold the row lock (and on SQLite, the whole database) through the
+    scrape, search or LLM call that usually follows.
+    """
+    for name, value in fields.items():
+        setattr(job, name, value)
+    if message:
+        job.add_event(message)
+    db.session.commit()
     
+    delta = {name: value.isoformat() if isinstance(value, datetime) else value
+             for name, value in fields.items()}
+    delta['type'] = 'status'
+    if message:
+        delta['message'] = message
     try:
-        # Step 1: Initialize workflow
-        job.status = 'processing'
-        job.progress = 0
-        
-        workflow_manager = WorkflowManager()
-        job.workflow_state = workflow_manager.save_state()
-        job.current_phase = workflow_manager.current_phase
-        
-        # Step 2: Scrape website
-        job.messages.append(f"Retrieving content from {job.website_url}...")
-        website_content = scrape_website(job.website_url)
+        live_channel.publish(job.id, delta)
+    except Exception as e:
+        # Push updates are best-effort; polling still sees the job state
+        app.logger.warning(f"Could not publish status update for job {job.id}: {str(e)}")
+
+def release_connection():
+    """
+    Commit the session so its database connection goes back to the pool
+    
+    The workflows call this before every scrape, search or LLM call (in the
+    async variants, before every await). Otherwise the transaction begun by
+    the last attribute read would keep its connection through the call, so
+    jobs in flight beyond the pool size would wait for a connection (or, on
+    the event loop, block it). Job attributes read afterwards are loaded
+    again in a new, short transaction.
+    """
+    db.session.commit()
+
+def fail_job(job, exc, error=None, log_message=None):
+    """Mark a job as failed and log the exception being handled"""
+    error = error or str(exc)
+    app.logger.error(log_message or error)
+    import traceback
+    app.logger.error(traceback.format_exc())
+    
+    # A failed flush leaves the session unusable until it is rolled back
+    if not db.session.is_active:
+        db.session.rollback()
+    job_id = job.id
+    try:
+        update_job(job, status='error', error_message=error, message=f"Error: {str(exc)}")
+    except Exception as e:
+        # Often the same database error that failed the job; the caller is already handling one
+        db.session.rollback()
+        app.logger.error(f"Could not mark job {job_id} as failed: {str(e)}")
+
+def phase_models(phase, task=None):
+    """Models to try for a phase (or one of its tasks), in fallback order, from MODEL_ROUTES"""
+    routes = app.config.get('MODEL_ROUTES') or {}
+    return routes.get(task) or routes.get(phase) or [app.config.get('OPENAI_MODEL') or 'gpt-4o']
+
+def usage_logger(job_id, phase, prompt, model):
+    """on_usage callback logging how much of a call's prompt the provider served from its cache"""
+    def log(usage):
+        app.logger.info(f"{prompt.name} for job {job_id} ({phase}, {model}): {usage['cached_tokens']} of "
+                        f"{usage['prompt_tokens']} prompt tokens cached, {usage['completion_tokens']} completion tokens")
+    return log
+
+def fall_back(job_id, phase, model, models, response):
+    """
+    Whether to retry a failed agent call on the next model of the chain
+    
+    Returns:
+        bool: True if the response is an error and another model is left
+    """
+    if not response.startswith("Error") or model == models[-1]:
+        return False
+    next_model = models[models.index(model) + 1]
+    app.logger.warning(f"{phase} on {model} failed for job {job_id}, retrying on {next_model}: {response}")
+    return True
+
+def run_phase_agent(job_id, phase, prompt, part=None, label=None, on_delta=None):
+    """
+    Run an agent for a workflow phase, streaming its output to the job's live channel
+    
+    The model comes from the phase's MODEL_ROUTES chain; a call that fails is
+    retried on the next model, and each attempt starts by clearing the live
+    output of the one before. Latency and token counts go to the phase metrics.
+    Calls running side by side within a phase pass a `part` (and display `label`)
+    so their streamed output stays separate.
+    
+    Args:
+        prompt (Prompt): Messages from render_prompt()
+        on_delta (callable): Receives the output instead of the live channel,
+            e.g. a speculative Branch; an exception it raises stops the call
+    """
+    writer = PartialOutputWriter(live_channel, job_id, phase, part=part, label=label) if on_delta is None else None
+    models = phase_models(phase, prompt.name)
+    try:
+        for model in models:
+            if writer is not None:
+                writer.reset()
+            call = phase_metrics.start(phase, model, on_delta=on_delta or writer,
+                                       on_usage=usage_logger(job_id, phase, prompt, model))
+            try:
+                response = run_agent_with_openai(prompt.system, prompt.user, model=model, context=prompt.context,
+                                                 on_delta=call.on_delta, on_usage=call.on_usage)
+            except Exception:
+                call.finish(ok=False)
+                raise
+            call.finish(ok=not response.startswith("Error"))
+            if not fall_back(job_id, phase, model, models, response):
+                return response
+    finally:
+        if writer is not None:
+            writer.close()
+
+async def run_phase_agent_async(job_id, phase, prompt, part=None, label=None, on_delta=None):
+    """Async version of run_phase_agent()"""
+    writer = PartialOutputWriter(live_channel, job_id, phase, part=part, label=label) if on_delta is None else None
+    models = phase_models(phase, prompt.name)
+    try:
+        for model in models:
+            if writer is not None:
+                writer.reset()
+            call = phase_metrics.start(phase, model, on_delta=on_delta or writer,
+                                       on_usage=usage_logger(job_id, phase, prompt, model))
+            try:
+                response = await run_agent_with_openai_async(prompt.system, prompt.user, model=model,
+                                                             context=prompt.context, on_delta=call.on_delta,
+                                                             on_usage=call.on_usage)
+            except Exception:
+                call.finish(ok=False)
+                raise
+            call.finish(ok=not response.startswith("Error"))
+            if not fall_back(job_id, phase, model, models, response):
+                return response
+    finally:
+        if writer is not None:
+            writer.close()
+
+def part_failed(job_id, phase, label, response):
+    """
+    Whether one part of a fanned-out phase failed; logs the failure
+    
+    A failed part must not be merged into the plan as if it were content,
+    so callers retry it once and then fail the phase (see run_part_agent()).
+    """
+    if not response.startswith("Error"):
+        return False
+    app.logger.warning(f"{phase} part '{label}' failed for job {job_id}: {response}")
+    return True
+
+def run_part_agent(job_id, phase, prompt, part, label):
+    """
+    run_phase_agent() for one part of a fanned-out phase, retried once if it fails
+    
+    Raises:
+        RuntimeError: If the part fails again, which fails the phase
+    """
+    for attempt in range(2):
+        response = run_phase_agent(job_id, phase, prompt, part=part, label=label)
+        if not part_failed(job_id, phase, label, response):
+            return response
+    raise RuntimeError(f"{phase} failed for {label}: {response}")
+
+async def run_part_agent_async(job_id, phase, prompt, part, label):
+    """Async version of run_part_agent()"""
+    for attempt in range(2):
+        response = await run_phase_agent_async(job_id, phase, prompt, part=part, label=label)
+        if not part_failed(job_id, phase, label, response):
+            return response
+    raise RuntimeError(f"{phase} failed for {label}: {response}")
+
+# "### Pillar Topic 1: Name" headings in the STRATEGY output
+PILLAR_HEADING = re.compile(r'^#{2,4}\s*Pillar Topic\b[^:\n]*:\s*(.+?)\s*$', re.MULTILINE)
+
+def parse_pillars(content_cluster):
+    """
+    Split a content cluster into its pillar topics
+    
+    Returns:
+        tuple: (overview text before the first pillar, list of dicts with the
+            pillar 'title' and its full 'section' text)
+    """
+    content_cluster = content_cluster or ''
+    matches = list(PILLAR_HEADING.finditer(content_cluster))
+    if not matches:
+        return content_cluster.strip(), []
+    
+    pillars = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content_cluster)
+        pillars.append({
+            'title': match.group(1).strip('*[] '),
+            'section': content_cluster[match.start():end].strip()
+        })
+    return content_cluster[:matches[0].start()].strip(), pillars
+
+def merge_article_ideas(selected_theme, pillars, pillar_ideas):
+    """Stitch per-pillar article ideas into one document, in pillar order"""
+    sections = [f"## Content Ideas: {selected_theme['title']}"]
+    for i, (pillar, ideas) in enumerate(zip(pillars, pillar_ideas), 1):
+        sections.append(f"### Pillar Topic {i}: {pillar['title']}\n\n{ideas.strip()}")
+    return '\n\n'.join(sections) + '\n'
+
+def insert_before_heading(text, heading, block):
+    """Insert block before the first '## <heading>' line of text, or append it if there is none"""
+    match = re.search(rf'^##\s*{re.escape(heading)}', text, re.MULTILINE)
+    if match is None:
+        return f"{text.rstrip()}\n\n{block}\n"
+    return f"{text[:match.start()]}{block}\n\n{text[match.start():]}"
+
+def stitch_final_plan(brand_brief, summary, pillar_sections):
+    """
+    Assemble the final plan from the editorial framing sections and the
+    separately edited pillar sections
+    """
+    # The framing pass sometimes adds the document title itself
+    plan = re.sub(r'^#\s[^\n]*\n', '', summary.strip())
+    plan = insert_before_heading(plan, 'Selected Theme', f"## Brand Brief\n{brand_brief.strip()}")
+    recommendations = '\n\n'.join(section.strip() for section in pillar_sections)
+    plan = insert_before_heading(plan, 'Implementation Guidelines',
+                                 f"## Content Cluster & Article Recommendations\n\n{recommendations}")
+    return f"# Final Content Plan\n\n{plan}"
+
+def parse_research_response(response):
+    """Split the research agent's response into (brand brief, search analysis)"""
+    brand_brief = ""
+    search_analysis = ""
+    
+    if "## Brand Brief" in response:
+        remaining = response.split("## Brand Brief", 1)[1]
+        if "## Search Results Analysis" in remaining:
+            brand_parts = remaining.split("## Search Results Analysis", 1)
+            brand_brief = brand_parts[0].strip()
+            search_analysis = brand_parts[1].strip()
+        else:
+            brand_brief = remaining.strip()
+    
+    return brand_brief, search_analysis
+
+def parse_themes(response):
+    """Parse the numbered themes out of the analysis agent's response"""
+    themes = []
+    if "## Content Themes" in response:
+        themes_text = response.split("## Content Themes", 1)[1].strip()
         
-        if website_content.startswith("Error"):
-            job.status = 'error'
-            job.error = website_content
-            job.messages.append(website_content)
-            return
+        pattern = r'(\d+)\.\s+\*\*(.*?)\*\*\s+(.*?)(?=\d+\.\s+\*\*|\Z)'
+        for match in re.finditer(pattern, themes_text, re.DOTALL):
+            themes.append({
+                "number": int(match.group(1).strip()),
+                "title": match.group(2).strip(),
+                "description": match.group(3).strip()
+            })
+    
+    return themes
+
+# Workflow steps shared by the sync and async workflows. Each one only touches
+# the job; the drivers below decide how the I/O between them is run.
+
+def find_reusable_job(website_url, keywords):
+    """
+    Recent job for the same URL and keyword set, within JOB_DEDUP_WINDOW
+    
+    Every submission gets its own job and theme selection; only finished
+    research is shared, never a job still in flight.
+    
+    Returns:
+        Job: A job with content themes to copy, or None if the submission
+            needs a new run
+    """
+    window = app.config.get('JOB_DEDUP_WINDOW', 0)
+    if window <= 0:
+        return None
+    
+    since = datetime.utcnow() - timedelta(seconds=window)
+    return Job.find_reusable(submission_fingerprint(website_url, keywords), since)
+
+def reuse_research(job, source):
+    """Copy a finished job's ingestion, research and themes, leaving the job awaiting selection"""
+    workflow_manager = start_workflow(job)
+    update_job(job, message=f"Reusing research from an identical submission ({source.id})")
+    
+    job.website_content_length = source.website_content_length
+    job.search_results = source.search_results
+    job.search_results_count = source.search_results_count
+    advance_workflow(job, workflow_manager, progress=20)  # To RESEARCH
+    
+    job.brand_brief = source.brand_brief
+    job.search_analysis = source.search_analysis
+    advance_workflow(job, workflow_manager, progress=40)  # To ANALYSIS
+    
+    advance_workflow(job, workflow_manager, content_themes=source.content_themes, progress=60)  # To THEME_SELECTION
+    update_job(job, status='awaiting_selection', message="Waiting for user to select a content theme")
+    start_speculation(job)
+
+def start_workflow(job):
+    """Mark the job as processing and return a fresh workflow manager"""
+    update_job(job, status='processing', progress=0)
+    
+    workflow_manager = WorkflowManager()
+    save_workflow(job, workflow_manager)
+    update_job(job, current_phase=workflow_manager.current_phase)
+    return workflow_manager
+
+def save_workflow(job, workflow_manager):
+    """Store the workflow state, logging its new phase transitions as job events"""
+    job.workflow_state = workflow_manager.save_state()
+    for transition in workflow_manager.pop_transitions():
+        job.add_event(kind='transition', data=transition)
+
+def advance_workflow(job, workflow_manager, **fields):
+    """Move the job to the next workflow phase, applying any extra status fields"""
+    workflow_manager.advance_phase()
+    save_workflow(job, workflow_manager)
+    update_job(job, current_phase=workflow_manager.current_phase, **fields)
+
+def announce_ingestion(job):
+    update_job(job, message=f"Retrieving content from {job.website_url}...")
+    update_job(job, message=f"Searching for keywords: {', '.join(job.keyword_list)}")
+
+def record_ingestion(job, workflow_manager, website_content, search):
+    """
+    Store the scraped content and keyword search results
+    
+    Returns:
+        bool: False if the job failed and the workflow must stop
+    """
+    if website_content.startswith("Error"):
+        update_job(job, status='error', error_message=website_content, message=website_content)
+        return False
+    
+    job.website_content_length = len(website_content)
+    update_job(job, progress=10, message=f"Retrieved {len(website_content)} characters of content")
+    
+    # Report keyword search results, deduplicated in keyword order
+    unique_results, failed_keywords = search
+    
+    for keyword, error in failed_keywords.items():
+        if error == "No results found":
+            update_job(job, message=f"No results found for keyword: {keyword}")
+        else:
+            update_job(job, message=f"Error searching for '{keyword}': {error}")
+    
+    total_results = len(unique_results)
+    
+    if total_results == 0:
+        no_results = "No search results were found for any keywords. Try different keywords."
+        update_job(job, status='error', error_message=no_results, message=no_results)
+        return False
+    
+    job.search_results = unique_results
+    job.search_results_count = total_results
+    update_job(job, progress=20, message=f"Found {total_results} unique search results after deduplication")
+    
+    # Begin agent workflow
+    update_job(job, message="Starting content research workflow...")
+    advance_workflow(job, workflow_manager)  # To RESEARCH
+    update_job(job, message="RESEARCH PHASE: Analyzing website content and search results")
+    return True
+
+def record_research(job, workflow_manager, response):
+    job.brand_brief, job.search_analysis = parse_research_response(response)
+    update_job(job, progress=40, message="Completed research phase with brand brief and search analysis")
+    
+    advance_workflow(job, workflow_manager)  # To ANALYSIS
+    update_job(job, message="ANALYSIS PHASE: Identifying content themes")
+
+def record_themes(job, workflow_manager, response):
+    themes = parse_themes(response)
+    update_job(job, content_themes=themes, progress=60, message=f"Identified {len(themes)} content themes")
+    
+    advance_workflow(job, workflow_manager)  # To THEME_SELECTION
+    
+    # Wait for user to select a theme
+    update_job(job, status='awaiting_selection', message="Waiting for user to select a content theme")
+    start_speculation(job)
+
+def resume_workflow(job):
+    """
+    Load the workflow state of a job whose theme has been selected
+    
+    Returns:
+        tuple: (workflow manager, selected theme), or None if the job failed
+    """
+    workflow_manager = WorkflowManager()
+    workflow_manager.load_state(job.workflow_state)
+    
+    selected_theme = job.selected_theme
+    if not selected_theme:
+        update_job(job, status='error', error_message="No theme was selected", message="Error: No theme was selected")
+        return None
+    
+    update_job(job, message="STRATEGY PHASE: Creating content cluster framework")
+    return workflow_manager, selected_theme
+
+def start_speculation(job):
+    """
+    Precompute STRATEGY for the leading themes while the user chooses, if enabled
+    
+    Branches are queued on the process-wide speculation pool, so they never
+    hold a job executor slot. Under the inline executor there is no
+    background to run them in, and speculation is skipped.
+    """
+    if not app.config.get('SPECULATIVE_STRATEGY') or executor.backend == 'inline':
+        return
+    if job.status != 'awaiting_selection' or not job.content_themes:
+        return
+    
+    # The analysis agent lists its strongest themes first
+    themes = sorted(job.content_themes, key=lambda theme: theme.get('number', 0))
+    themes = themes[:app.config.get('SPECULATIVE_STRATEGY_THEMES', 3)]
+    job_id = job.id
+    brand_brief = job.brand_brief
+    
+    # Branches list themselves as running once they start (see speculate_strategy())
+    job.speculative_strategy = {'running': [], 'clusters': {}}
+    db.session.commit()
+    
+    budget = SpeculationBudget(app.config.get('SPECULATIVE_STRATEGY_TOKEN_BUDGET', 30000))
+    for theme in themes:
+        branch = Branch(theme['number'], budget,
+                        still_wanted=lambda number=theme['number']: branch_wanted(job_id, number))
+        speculation_pool.submit(speculate_strategy, job_id, brand_brief, theme, branch)
+
+def branch_wanted(job_id, theme_number):
+    """Whether a running branch can still be used: its job awaits a selection or selected its theme"""
+    status = Job.get_status(job_id, ['status', 'selected_theme'])
+    # Don't hold a transaction open while the branch streams
+    db.session.rollback()
+    
+    if status is None or status['status'] == 'error':
+        return False
+    # A claimed selection (see theme_selection()) is recorded just after the status changes
+    if status['status'] == 'awaiting_selection' or not status['selected_theme']:
+        return True
+    return status['selected_theme'].get('number') == theme_number
+
+def update_speculation(job_id, change):
+    """
+    Apply change() to a job's speculative_strategy artifact and commit
+    
+    Branches of one job finish concurrently; the row lock keeps their
+    read-modify-write updates apart.
+    """
+    artifact = (JobArtifact.query.filter_by(job_id=job_id, name='speculative_strategy')
+                .with_for_update().first())
+    if artifact is not None:
+        content = artifact.content or {}
+        speculation = {'running': list(content.get('running', [])), 'clusters': dict(content.get('clusters', {}))}
+        change(speculation)
+        artifact.content = speculation
+    db.session.commit()
+
+def speculative_prompt(brand_brief, theme, branch):
+    """
+    STRATEGY prompt for a branch, charging it to the budget
+    
+    Returns:
+        Prompt: The prompt, or None if the branch is cancelled or the prompt does not fit
+    """
+    prompt = render_prompt('STRATEGY', brand_brief=brand_brief, selected_theme=theme)
+    tokens = estimate_tokens(prompt.system + prompt.context + prompt.user)
+    if branch.cancelled or not branch.budget.reserve(tokens):
+        return None
+    return prompt
+
+def speculation_result(branch, content_cluster):
+    """The branch's cluster if it is worth keeping, else None"""
+    if branch.cancelled or not content_cluster or content_cluster.startswith("Error"):
+        return None
+    return content_cluster
+
+def speculate_strategy(job_id, brand_brief, theme, branch):
+    """
+    Run STRATEGY for one candidate theme while the user chooses, on the speculation pool
+    
+    The branch lists itself as running in the job's speculative_strategy
+    artifact before checking that the job still awaits a selection, so a
+    selection either finds it running and waits for it in
+    adopt_speculative_cluster(), or arrived first and the branch is dropped.
+    The call goes through run_phase_agent(), so it falls back along the
+    STRATEGY model chain and shows up in the phase metrics (a cancelled branch
+    counts as a failed call), but its output isn't streamed to the live
+    channel. Once another theme is selected (or the job fails) the branch
+    stops mid-stream; see Branch.
+    """
+    number = branch.key
+    content_cluster = None
+    with app.app_context():
+        try:
+            update_speculation(job_id, lambda speculation: speculation['running'].append(number))
+            status = Job.get_status(job_id, ['status'])
+            db.session.rollback()
+            
+            prompt = None
+            if status is not None and status['status'] == 'awaiting_selection':
+                prompt = speculative_prompt(brand_brief, theme, branch)
+            if prompt is not None:
+                content_cluster = speculation_result(
+                    branch, run_phase_agent(job_id, 'STRATEGY', prompt, on_delta=branch))
+        except BranchCancelled:
+            app.logger.info(f"Cancelled speculative strategy for theme {number} of job {job_id}")
+        except Exception as e:
+            app.logger.error(f"Speculative strategy failed for theme {number} of job {job_id}: {str(e)}")
+            db.session.rollback()
         
-        job.website_content_length = len(website_content)
-        job.progress = 10
-        job.messages.append(f"Retrieved {len(website_content)} characters of content")
+        def finish(speculation):
+            speculation['running'] = [n for n in speculation['running'] if n != number]
+            if content_cluster:
+                speculation['clusters'][str(number)] = content_cluster
         
-        # Step 3: Search for keywords
-        job.messages.append(f"Searching for keywords: {', '.join(job.keywords)}")
-        all_search_results = []
-        failed_keywords = []
+        try:
+            update_speculation(job_id, finish)
+        except Exception as e:
+            app.logger.error(f"Could not store speculative strategy for job {job_id}: {str(e)}")
+            db.session.rollback()
+    
+    app.logger.info(f"Speculative strategy for theme {number} of job {job_id}: "
+                    f"{'stored' if content_cluster else 'no cluster'}, ~{int(branch.budget.spent)} tokens spent by the job")
+
+def speculation_state(job, theme_number):
+    """
+    Look up the speculative cluster for a theme
+    
+    Returns:
+        tuple: (cluster or None, whether its branch is still running)
+    """
+    # Written by the speculation task's own session; reload it
+    db.session.expire(job, ['artifacts'])
+    speculation = job.speculative_strategy or {}
+    cluster = speculation.get('clusters', {}).get(str(theme_number))
+    return cluster, theme_number in speculation.get('running', [])
+
+def adopt_speculative_cluster(job, selected_theme):
+    """
+    The content cluster precomputed for the selected theme, if there is one
+    
+    Waits up to SPECULATIVE_STRATEGY_WAIT seconds for a branch still running.
+    
+    Returns:
+        str: The content cluster, or None if STRATEGY has to run now
+    """
+    if not app.config.get('SPECULATIVE_STRATEGY'):
+        return None
+    
+    deadline = time.monotonic() + app.config.get('SPECULATIVE_STRATEGY_WAIT', 60)
+    cluster, running = speculation_state(job, selected_theme.get('number'))
+    while cluster is None and running and time.monotonic() < deadline:
+        release_connection()
+        time.sleep(0.5)
+        cluster, running = speculation_state(job, selected_theme.get('number'))
+    
+    if cluster is not None:
+        update_job(job, message="Using the content cluster prepared while the theme was being selected")
+    return cluster
+
+async def adopt_speculative_cluster_async(job, selected_theme):
+    """Async version of adopt_speculative_cluster()"""
+    if not app.config.get('SPECULATIVE_STRATEGY'):
+        return None
+    
+    deadline = time.monotonic() + app.config.get('SPECULATIVE_STRATEGY_WAIT', 60)
+    cluster, running = speculation_state(job, selected_theme.get('number'))
+    while cluster is None and running and time.monotonic() < deadline:
+        release_connection()
+        await asyncio.sleep(0.5)
+        cluster, running = speculation_state(job, selected_theme.get('number'))
+    
+    if cluster is not None:
+        update_job(job, message="Using the content cluster prepared while the theme was being selected")
+    return cluster
+
+def record_content_cluster(job, workflow_manager, content_cluster):
+    job.content_cluster = content_cluster
+    update_job(job, progress=70, message="Completed content cluster framework")
+    
+    advance_workflow(job, workflow_manager)  # To CONTENT_IDEATION
+    update_job(job, message="CONTENT IDEATION PHASE: Developing article ideas")
+
+def record_article_ideas(job, workflow_manager, article_ideas):
+    job.article_ideas = article_ideas
+    update_job(job, progress=85, message="Developed article ideas for the content plan")
+    
+    advance_workflow(job, workflow_manager)  # To EDITORIAL
+    update_job(job, message="EDITORIAL PHASE: Refining the content plan")
+
+def record_final_plan(job, workflow_manager, final_plan):
+    job.final_plan = final_plan
+    update_job(job, progress=100)
+    
+    # Complete the workflow
+    advance_workflow(
+        job,
+        workflow_manager,  # To COMPLETION
+        status='completed',
+        completed_at=datetime.utcnow(),
+        message="Workflow complete! Content plan is ready."
+    )
+
+def run_content_ideation(job_id, brand_brief, selected_theme, content_cluster):
+    """
+    Run CONTENT_IDEATION as concurrent per-pillar agent calls
+    
+    Clusters that can't be split into at least two pillar topics get the
+    single whole-cluster call instead.
+    
+    Returns:
+        tuple: (article ideas, list of per-pillar ideas or None if not fanned out)
+    
+    Raises:
+        RuntimeError: If a pillar fails twice (see run_part_agent())
+    """
+    overview, pillars = parse_pillars(content_cluster)
+    if len(pillars) < 2:
+        article_ideas = run_phase_agent(
+            job_id, 'CONTENT_IDEATION',
+            render_prompt('CONTENT_IDEATION', brand_brief=brand_brief, selected_theme=selected_theme,
+                          content_cluster=content_cluster)
+        )
+        return article_ideas, None
+    
+    # Stages run on worker threads and only need the job id
+    def ideate(i, pillar):
+        return lambda: run_part_agent(
+            job_id, 'CONTENT_IDEATION',
+            render_prompt('PILLAR_IDEATION', brand_brief=brand_brief, selected_theme=selected_theme,
+                          overview=overview, pillar=pillar),
+            part=i, label=pillar['title']
+        )
+    
+    results = run_pipeline(
+        [Stage(f"pillar_{i}", ideate(i, pillar)) for i, pillar in enumerate(pillars)],
+        max_workers=app.config.get('PILLAR_CONCURRENCY', 4),
+        context=app.app_context
+    )
+    pillar_ideas = [results[f"pillar_{i}"] for i in range(len(pillars))]
+    return merge_article_ideas(selected_theme, pillars, pillar_ideas), pillar_ideas
+
+def run_editorial(job_id, brand_brief, selected_theme, content_cluster, article_ideas, pillar_ideas):
+    """
+    Run EDITORIAL as concurrent per-pillar edits plus a short framing pass
+    
+    The framing sections (summary, theme rationale, implementation notes) are
+    written alongside the pillar edits and everything is stitched together,
+    so no single call has to rewrite the whole plan.
+    
+    Returns:
+        str: The final content plan
+    
+    Raises:
+        RuntimeError: If a pillar edit or the framing pass fails twice (see run_part_agent())
+    """
+    if pillar_ideas is None:
+        return run_phase_agent(
+            job_id, 'EDITORIAL',
+            render_prompt('EDITORIAL', brand_brief=brand_brief, selected_theme=selected_theme,
+                          content_cluster=content_cluster, article_ideas=article_ideas)
+        )
+    
+    overview, pillars = parse_pillars(content_cluster)
+    
+    def edit(i, pillar):
+        return lambda: run_part_agent(
+            job_id, 'EDITORIAL',
+            render_prompt('PILLAR_EDITORIAL', brand_brief=brand_brief, selected_theme=selected_theme,
+                          pillar=pillar, pillar_ideas=pillar_ideas[i]),
+            part=i, label=pillar['title']
+        )
+    
+    stages = [Stage(f"pillar_{i}", edit(i, pillar)) for i, pillar in enumerate(pillars)]
+    stages.append(Stage('summary', lambda: run_part_agent(
+        job_id, 'EDITORIAL',
+        render_prompt('EDITORIAL_SUMMARY', brand_brief=brand_brief, selected_theme=selected_theme,
+                      overview=overview, article_ideas=article_ideas),
+        part='summary', label='Summary'
+    )))
+    
+    results = run_pipeline(stages, max_workers=app.config.get('PILLAR_CONCURRENCY', 4),
+                           context=app.app_context)
+    return stitch_final_plan(brand_brief, results['summary'],
+                             [results[f"pillar_{i}"] for i in range(len(pillars))])
+
+async def gather_limited(coroutines):
+    """Await coroutines concurrently, at most PILLAR_CONCURRENCY at a time, returning results in order"""
+    slots = asyncio.Semaphore(app.config.get('PILLAR_CONCURRENCY', 4))
+    
+    async def limited(coroutine):
+        async with slots:
+            return await coroutine
+    
+    # Like run_pipeline(), stop the remaining calls once one fails
+    tasks = [asyncio.ensure_future(limited(coroutine)) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def run_content_ideation_async(job_id, brand_brief, selected_theme, content_cluster):
+    """Async version of run_content_ideation()"""
+    overview, pillars = parse_pillars(content_cluster)
+    if len(pillars) < 2:
+        article_ideas = await run_phase_agent_async(
+            job_id, 'CONTENT_IDEATION',
+            render_prompt('CONTENT_IDEATION', brand_brief=brand_brief, selected_theme=selected_theme,
+                          content_cluster=content_cluster)
+        )
+        return article_ideas, None
+    
+    pillar_ideas = await gather_limited([
+        run_part_agent_async(
+            job_id, 'CONTENT_IDEATION',
+            render_prompt('PILLAR_IDEATION', brand_brief=brand_brief, selected_theme=selected_theme,
+                          overview=overview, pillar=pillar),
+            part=i, label=pillar['title']
+        )
+        for i, pillar in enumerate(pillars)
+    ])
+    return merge_article_ideas(selected_theme, pillars, pillar_ideas), pillar_ideas
+
+async def run_editorial_async(job_id, brand_brief, selected_theme, content_cluster, article_ideas, pillar_ideas):
+    """Async version of run_editorial()"""
+    if pillar_ideas is None:
+        return await run_phase_agent_async(
+            job_id, 'EDITORIAL',
+            render_prompt('EDITORIAL', brand_brief=brand_brief, selected_theme=selected_theme,
+                          content_cluster=content_cluster, article_ideas=article_ideas)
+        )
+    
+    overview, pillars = parse_pillars(content_cluster)
+    *pillar_sections, summary = await gather_limited([
+        *(run_part_agent_async(
+            job_id, 'EDITORIAL',
+            render_prompt('PILLAR_EDITORIAL', brand_brief=brand_brief, selected_theme=selected_theme,
+                          pillar=pillar, pillar_ideas=pillar_ideas[i]),
+            part=i, label=pillar['title']
+        ) for i, pillar in enumerate(pillars)),
+        run_part_agent_async(
+            job_id, 'EDITORIAL',
+            render_prompt('EDITORIAL_SUMMARY', brand_brief=brand_brief, selected_theme=selected_theme,
+                          overview=overview, article_ideas=article_ideas),
+            part='summary', label='Summary'
+        )
+    ])
+    return stitch_final_plan(brand_brief, summary, pillar_sections)
+
+def process_workflow(job_id):
+    """Process the content workflow for a job"""
+    job = Job.get_by_id(job_id)
+    
+    try:
+        workflow_manager = start_workflow(job)
         
-        # Get API key from config
+        # Scrape the website and search keywords concurrently.
+        # Ingestion stages run on worker threads, so they must not touch the job object.
+        job_url = job.website_url
+        keywords = job.keyword_list
         serpapi_key = app.config.get('SERPAPI_API_KEY')
+        announce_ingestion(job)
+        release_connection()
         
-        for keyword in job.keywords:
-            try:
-                results = search_serpapi(keyword, serpapi_key)
-                if results:
-                    all_search_results.extend(results)
-                else:
-                    failed_keywords.append(keyword)
-                    job.messages.append(f"No results found for keyword: {keyword}")
-            except Exception as e:
-                failed_keywords.append(keyword)
-                job.messages.append(f"Error searching for '{keyword}': {str(e)}")
-        
-        # Deduplicate results
-        unique_results = deduplicate_results(all_search_results)
-        total_results = len(unique_results)
+        ingestion = run_pipeline([
+            Stage('website_content', lambda: get_website_content(job_url)),
+            Stage('search', lambda: search_many(
+                keywords,
+                serpapi_key,
+                num_results=app.config.get('RESULTS_PER_KEYWORD', 5)
+            ))
+        ], context=app.app_context)
         
-        if total_results == 0:
-            job.status = 'error'
-            job.error = "No search results were found for any keywords. Try different keywords."
-            job.messages.append("No search results were found for any keywords. Try different keywords.")
+        website_content = ingestion['website_content']
+        if not record_ingestion(job, workflow_manager, website_content, ingestion['search']):
             return
         
-        job.search_results = unique_results
-        job.search_results_count = total_results
-        job.progress = 20
-        job.messages.append(f"Found {total_results} unique search results after deduplication")
-        
-        # Step 4: Begin agent workflow
-        job.messages.append("Starting content research workflow...")
-        
-        # Advance workflow to RESEARCH phase
-        workflow_manager.advance_phase()  # To RESEARCH
-        job.workflow_state = workflow_manager.save_state()
-        job.current_phase = workflow_manager.current_phase
-        
-        # Research phase
-        job.messages.append("RESEARCH PHASE: Analyzing website content and search results")
-        from utils.agents import run_agent_with_openai
-        
-        system_message = """You are a research agent specialized in retrieving and summarizing content.
-        
-        Your specific responsibilities:
-        1. Analyze website content to create a 'brand_brief' that summarizes:
-           - What the business does
-           - Their target audience
-           - Their unique value proposition
-           - Their brand voice/tone
-        
-        2. Process search results from keywords to identify relevant information.
-           - Key topics and subtopics
-           - Frequently used keywords and phrases (SEO)
-           - Competitor topics
-           - Potential content gaps
-        
-        FORMAT YOUR OUTPUT:
-        
-        ## Brand Brief
-        [Provide a 200-300 word summary of the brand based on website content]
-        
-        ## Search Results Analysis
-        [Provide a 200-300 word analysis of key insights from the search results]
-        """
+        try:
+            prompt = render_prompt('RESEARCH', website_content=website_content,
+                                   search_results=job.search_results, keywords=keywords)
+            release_connection()
+            response = run_phase_agent(job_id, 'RESEARCH', prompt)
+            record_research(job, workflow_manager, response)
+            
+            prompt = render_prompt('ANALYSIS', brand_brief=job.brand_brief, search_analysis=job.search_analysis)
+            release_connection()
+            response = run_phase_agent(job_id, 'ANALYSIS', prompt)
+            record_themes(job, workflow_manager, response)
         
-        user_message = f"""
-        ## Website Content
-        {website_content[:8000]}... (truncated)
+        except Exception as e:
+            fail_job(job, e, error=f"Error in AI processing: {str(e)}")
+    
+    except Exception as e:
+        fail_job(job, e, log_message=f"Error processing job {job_id}: {str(e)}")
+
+async def process_workflow_async(job_id):
+    """
+    Async version of process_workflow()
+    
+    Runs on an event loop inside an application context (see JobExecutor),
+    so one worker process can have many jobs in flight. Scraping, search and
+    LLM calls are non-blocking; database and live channel writes are short
+    blocking calls. Everything an await needs from the job is read first and
+    the connection released (see release_connection()).
+    """
+    job = Job.get_by_id(job_id)
+    
+    try:
+        workflow_manager = start_workflow(job)
+        announce_ingestion(job)
+        job_url = job.website_url
+        keywords = job.keyword_list
+        release_connection()
         
-        ## Search Results
-        {json.dumps(unique_results[:10], indent=2)}
+        website_content, search = await asyncio.gather(
+            get_website_content_async(job_url),
+            search_many_async(
+                keywords,
+                app.config.get('SERPAPI_API_KEY'),
+                num_results=app.config.get('RESULTS_PER_KEYWORD', 5)
+            )
+        )
         
-        Please analyze this content and provide the Brand Brief and Search Results Analysis.
-        """
+        if not record_ingestion(job, workflow_manager, website_content, search):
+            return
         
         try:
-            response = run_agent_with_openai(system_message, user_message)
-            
-            # Parse the results
-            brand_brief = ""
-            search_analysis = ""
-            
-            if "## Brand Brief" in response:
-                parts = response.split("## Brand Brief", 1)
-                if len(parts) > 1:
-                    remaining = parts[1]
-                    if "## Search Results Analysis" in remaining:
-                        brand_parts = remaining.split("## Search Results Analysis", 1)
-                        brand_brief = brand_parts[0].strip()
-                        search_analysis = brand_parts[1].strip()
-                    else:
-                        brand_brief = remaining.strip()
-            
-            job.brand_brief = brand_brief
-            job.search_analysis = search_analysis
-            job.progress = 40
-            job.messages.append("Completed research phase with brand brief and search analysis")
-            
-            # Advance workflow to ANALYSIS phase
-            workflow_manager.advance_phase()  # To ANALYSIS
-            job.workflow_state = workflow_manager.save_state()
-            job.current_phase = workflow_manager.current_phase
-            
-            # Analysis phase
-            job.messages.append("ANALYSIS PHASE: Identifying content themes")
-            
-            system_message = """You are a content analyst who excels at identifying content opportunities and organizing information.
-            
-            Your specific responsibilities:
-            1. Review the brand brief and search results provided by the ResearchAgent
-            2. Identify exactly 6 high-level content themes that would be valuable for the brand
-            3. Present these themes in a structured format for user selection
-            
-            Each theme should:
-            - Address a specific audience need or pain point
-            - Align with the brand's offering and expertise
-            - Have potential for multiple related subtopics
-            - Offer strategic value (SEO, thought leadership, etc.)
-            
-            FORMAT YOUR OUTPUT:
-            
-            ## Content Themes
-            
-            1. **[Theme Title]**
-               [2-3 sentence description explaining the theme and its value]
-            
-            2. **[Theme Title]**
-               [2-3 sentence description explaining the theme and its value]
-            
-            [Continue for all 6 themes]
-            """
-            
-            user_message = f"""
-            ## Brand Brief
-            {brand_brief}
-            
-            ## Search Results Analysis
-            {search_analysis}
-            
-            Please identify 6 high-level content themes based on this information.
-            """
-            
-            response = run_agent_with_openai(system_message, user_message)
-            
-            # Parse the themes
-            themes = []
-            if "## Content Themes" in response:
-                themes_text = response.split("## Content Themes", 1)[1].strip()
-                
-                import re
-                pattern = r'(\d+)\.\s+\*\*(.*?)\*\*\s+(.*?)(?=\d+\.\s+\*\*|\Z)'
-                matches = re.finditer(pattern, themes_text, re.DOTALL)
-                
-                for match in matches:
-                    theme_num = match.group(1).strip()
-                    title = match.group(2).strip()
-                    description = match.group(3).strip()
-                    
-                    themes.append({
-                        "number": int(theme_num),
-                        "title": title,
-                        "description": description
-                    })
-            
-            job.content_themes = themes
-            job.progress = 60
-            job.messages.append(f"Identified {len(themes)} content themes")
-            
-            # Advance workflow to THEME_SELECTION phase
-            workflow_manager.advance_phase()  # To THEME_SELECTION
-            job.workflow_state = workflow_manager.save_state()
-            job.current_phase = workflow_manager.current_phase
-            
-            # Wait for user to select a theme
-            job.status = 'awaiting_selection'
-            job.messages.append("Waiting for user to select a content theme")
-            
+            prompt = render_prompt('RESEARCH', website_content=website_content,
+                                   search_results=job.search_results, keywords=keywords)
+            release_connection()
+            response = await run_phase_agent_async(job_id, 'RESEARCH', prompt)
+            record_research(job, workflow_manager, response)
+            
+            prompt = render_prompt('ANALYSIS', brand_brief=job.brand_brief, search_analysis=job.search_analysis)
+            release_connection()
+            response = await run_phase_agent_async(job_id, 'ANALYSIS', prompt)
+            record_themes(job, workflow_manager, response)
+        
         except Exception as e:
-            job.status = 'error'
-            job.error = f"Error in AI processing: {str(e)}"
-            job.messages.append(f"Error: {str(e)}")
-            app.logger.error(f"Error in AI processing: {str(e)}")
-            import traceback
-            app.logger.error(traceback.format_exc())
+            fail_job(job, e, error=f"Error in AI processing: {str(e)}")
     
     except Exception as e:
-        job.status = 'error'
-        job.error = str(e)
-        job.messages.append(f"Error: {str(e)}")
-        app.logger.error(f"Error processing job {job_id}: {str(e)}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        fail_job(job, e, log_message=f"Error processing job {job_id}: {str(e)}")
 
 def continue_workflow_after_selection(job_id):
-    """Continue the workflow after theme selection"""
+    """Continue the workflow after theme selection; releases the connection before each blocking call"""
     job = Job.get_by_id(job_id)
     
     try:
-        workflow_manager = WorkflowManager()
-        workflow_manager.load_state(job.workflow_state)
-        
-        # Get the selected theme
-        selected_theme = job.selected_theme
-        if not selected_theme:
-            job.status = 'error'
-            job.error = "No theme was selected"
-            job.messages.append("Error: No theme was selected")
+        resumed = resume_workflow(job)
+        if resumed is None:
             return
+        workflow_manager, selected_theme = resumed
         
-        # Strategy phase
-        job.messages.append("STRATEGY PHASE: Creating content cluster framework")
-        
-        from utils.agents import run_agent_with_openai
-        
-        system_message = """You are a content strategist who excels at creating strategic topic clusters and content hierarchies.
-        
-        Your specific responsibilities:
-        1. Based on the user-selected theme and brand brief, create a comprehensive content cluster framework
-        2. Design a hierarchy with pillar topics and supporting subtopics
-        3. Focus on strategic value, search intent, and content flow
-        
-        FORMAT YOUR OUTPUT:
-        
-        ## Content Cluster: [Theme Name]
-        
-        ### Brand Alignment
-        [2-3 sentences explaining how this content cluster aligns with the brand]
-        
-        ### Pillar Topic 1: [Topic Name]
-        - **Primary Search Intent**: [Informational/Navigational/Transactional]
-        - **Target Audience**: [Specific segment]
-        - **Strategic Value**: [SEO/Thought Leadership/Lead Generation/etc.]
-        
-        #### Supporting Subtopics:
-        1. [Subtopic 1]
-        2. [Subtopic 2]
-        3. [Subtopic 3]
-        
-        [Repeat for 2-3 more pillar topics]
-        """
-        
-        user_message = f"""
-        ## Brand Brief
-        {job.brand_brief}
-        
-        ## Selected Theme
-        **{selected_theme['title']}**
-        {selected_theme['description']}
+        try:
+            brand_brief = job.brand_brief
+            content_cluster = adopt_speculative_cluster(job, selected_theme)
+            if content_cluster is None:
+                release_connection()
+                content_cluster = run_phase_agent(job_id, 'STRATEGY', render_prompt(
+                    'STRATEGY', brand_brief=brand_brief, selected_theme=selected_theme))
+            record_content_cluster(job, workflow_manager, content_cluster)
+            
+            release_connection()
+            article_ideas, pillar_ideas = run_content_ideation(job_id, brand_brief, selected_theme,
+                                                               content_cluster)
+            record_article_ideas(job, workflow_manager, article_ideas)
+            
+            release_connection()
+            final_plan = run_editorial(job_id, brand_brief, selected_theme, content_cluster,
+                                       article_ideas, pillar_ideas)
+            record_final_plan(job, workflow_manager, final_plan)
         
-        Please create a content cluster framework based on this theme.
-        """
+        except Exception as e:
+            fail_job(job, e, error=f"Error in AI processing: {str(e)}")
+    
+    except Exception as e:
+        fail_job(job, e, log_message=f"Error in theme selection workflow: {str(e)}")
+
+async def continue_workflow_after_selection_async(job_id):
+    """Async version of continue_workflow_after_selection(); releases the connection before each await"""
+    job = Job.get_by_id(job_id)
+    
+    try:
+        resumed = resume_workflow(job)
+        if resumed is None:
+            return
+        workflow_manager, selected_theme = resumed
         
         try:
-            content_cluster = run_agent_with_openai(system_message, user_message)
-            
-            job.content_cluster = content_cluster
-            job.progress = 70
-            job.messages.append("Completed content cluster framework")
-            
-            # Advance workflow to CONTENT_IDEATION phase
-            workflow_manager.advance_phase()  # To CONTENT_IDEATION
-            job.workflow_state = workflow_manager.save_state()
-            job.current_phase = workflow_manager.current_phase
-            
-            # Content ideation phase
-            job.messages.append("CONTENT IDEATION PHASE: Developing article ideas")
-            
-            system_message = """You are a content writer who excels at creating compelling article ideas and titles for blog content.
-            
-            Your specific responsibilities:
-            1. Review the strategist's content cluster framework and the brand brief
-            2. Create article concepts for both pillar content and supporting spoke articles
-            3. Develop titles that are both SEO-friendly and engaging to readers
-            
-            For each pillar topic, create:
-            - 1 in-depth pillar article concept with title and brief description
-            - 3-5 supporting spoke article concepts with titles and brief descriptions
-            
-            FORMAT YOUR OUTPUT:
-            
-            ## Content Ideas: [Theme Name]
-            
-            ### Pillar Article: [Compelling Title]
-            - **Target Keyword**: [Primary keyword]
-            - **Word Count**: [Recommended length]
-            - **Article Type**: [Guide/How-To/List/etc.]
-            - **Description**: [2-3 sentence summary of the article content]
-            
-            ### Supporting Articles:
-            
-            1. **[Spoke Article Title #1]**
-               - **Target Keyword**: [Related keyword]
-               - **Description**: [1-2 sentence summary]
-            
-            2. **[Spoke Article Title #2]**
-               - **Target Keyword**: [Related keyword]
-               - **Description**: [1-2 sentence summary]
-            
-            [Continue for all supporting articles]
-            
-            [Repeat for each pillar topic in the content cluster]
-            """
-            
-            user_message = f"""
-            ## Brand Brief
-            {job.brand_brief}
-            
-            ## Selected Theme
-            **{selected_theme['title']}**
-            {selected_theme['description']}
-            
-            ## Content Cluster Framework
-            {content_cluster}
-            
-            Please create article ideas based on this content cluster framework.
-            """
-            
-            article_ideas = run_agent_with_openai(system_message, user_message)
-            
-            job.article_ideas = article_ideas
-            job.progress = 85
-            job.messages.append("Developed article ideas for the content plan")
-            
-            # Advance workflow to EDITORIAL phase
-            workflow_manager.advance_phase()  # To EDITORIAL
-            job.workflow_state = workflow_manager.save_state()
-            job.current_phase = workflow_manager.current_phase
-            
-            # Editorial phase
-            job.messages.append("EDITORIAL PHASE: Refining the content plan")
-            
-            system_message = """You are a content editor who excels at refining content plans for clarity, style, and strategic alignment.
-            
-            Your specific responsibilities:
-            1. Review the entire content plan created by previous agents
-            2. Ensure consistency in tone, terminology, and approach across all proposed content
-            3. Refine article titles for SEO, brand alignment, and audience appeal
-            4. Format the final deliverable in professional Markdown
-            5. Add strategic recommendations and implementation notes
-            
-            FORMAT YOUR OUTPUT:
-            
-            # Final Content Plan
-            
-            ## Executive Summary
-            [3-5 sentences summarizing the overall content strategy and expected outcomes]
-            
-            ## Brand Brief
-            [Include the refined brand brief]
-            
-            ## Selected Theme: [Theme Name]
-            [Brief description of why this theme is strategically valuable]
-            
-            ## Content Cluster Structure
-            [Include the refined content cluster framework]
-            
-            ## Article Recommendations
-            [Include the refined article concepts, organized by pillar topics]
-            
-            ## Implementation Guidelines
-            - **Recommended Publishing Cadence**: [e.g., 2 articles per week]
-            - **Content Distribution Channels**: [Recommendations based on brand and audience]
-            - **Success Metrics**: [KPIs to track]
-            - **Additional Considerations**: [Any other strategic notes]
-            
-            ## Next Steps
-            [3-5 bullet points outlining recommended next actions]
-            """
-            
-            user_message = f"""
-            ## Brand Brief
-            {job.brand_brief}
-            
-            ## Selected Theme
-            **{selected_theme['title']}**
-            {selected_theme['description']}
-            
-            ## Content Cluster Framework
-            {content_cluster}
-            
-            ## Article Ideas
-            {article_ideas}
-            
-            Please create the final content plan by reviewing and refining all of the above components.
-            """
-            
-            final_plan = run_agent_with_openai(system_message, user_message)
-            
-            job.final_plan = final_plan
-            job.progress = 100
-            
-            # Complete the workflow
-            workflow_manager.advance_phase()  # To COMPLETION
-            job.workflow_state = workflow_manager.save_state()
-            job.current_phase = workflow_manager.current_phase
-            job.status = 'completed'
-            job.completed_at = datetime.now().isoformat()
-            job.messages.append("Workflow complete! Content plan is ready.")
-            
+            brand_brief = job.brand_brief
+            content_cluster = await adopt_speculative_cluster_async(job, selected_theme)
+            if content_cluster is None:
+                release_connection()
+                content_cluster = await run_phase_agent_async(job_id, 'STRATEGY', render_prompt(
+                    'STRATEGY', brand_brief=brand_brief, selected_theme=selected_theme))
+            record_content_cluster(job, workflow_manager, content_cluster)
+            
+            release_connection()
+            article_ideas, pillar_ideas = await run_content_ideation_async(job_id, brand_brief, selected_theme,
+                                                                           content_cluster)
+            record_article_ideas(job, workflow_manager, article_ideas)
+            
+            release_connection()
+            final_plan = await run_editorial_async(job_id, brand_brief, selected_theme, content_cluster,
+                                                   article_ideas, pillar_ideas)
+            record_final_plan(job, workflow_manager, final_plan)
+        
         except Exception as e:
-            job.status = 'error'
-            job.error = f"Error in AI processing: {str(e)}"
-            job.messages.append(f"Error: {str(e)}")
-            app.logger.error(f"Error in AI processing: {str(e)}")
-            import traceback
-            app.logger.error(traceback.format_exc())
+            fail_job(job, e, error=f"Error in AI processing: {str(e)}")
     
     except Exception as e:
-        job.status = 'error'
-        job.error = str(e)
-        job.messages.append(f"Error: {str(e)}")
-        app.logger.error(f"Error in theme selection workflow: {str(e)}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        fail_job(job, e, log_message=f"Error in theme selection workflow: {str(e)}")
+
+# Register workflow functions with the background executor
+executor.register('process_workflow', process_workflow, process_workflow_async)
+executor.register('continue_workflow_after_selection', continue_workflow_after_selection,
+                  continue_workflow_after_selection_async)
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,108 @@
+"""
+Benchmark the HTML extraction backends on a corpus of saved pages.
+
+Usage:
+    python benchmarks/bench_extract.py path/to/pages [--backends bs4,lxml,stream] [--repeat 5]
+
+The corpus is a directory of .html files (save them with e.g. `curl -o`).
+For each backend the script reports the median parse time per page, total
+time across the corpus and peak Python heap usage measured with tracemalloc.
+Peak memory of C extensions (lxml) is only partly visible to tracemalloc, so
+each backend also runs in its own subprocess to report peak RSS.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.extract import EXTRACTORS
+
+def load_corpus(path):
+    pages = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(path, name), 'rb') as f:
+                pages.append((name, f.read()))
+    return pages
+
+def run_backend(backend, pages, repeat):
+    """Time a backend over the corpus and return its measurements."""
+    extract = EXTRACTORS[backend]
+    per_page = []
+    chars = 0
+
+    for name, html in pages:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = extract(html, f"https://example.com/{name}")
+            timings.append(time.perf_counter() - start)
+        per_page.append(statistics.median(timings))
+        chars += len(result['text'])
+
+    # Peak heap for the single most expensive page
+    peaks = []
+    for name, html in pages:
+        tracemalloc.start()
+        extract(html, f"https://example.com/{name}")
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'backend': backend,
+        'pages': len(pages),
+        'median_ms': round(statistics.median(per_page) * 1000, 2),
+        'total_ms': round(sum(per_page) * 1000, 2),
+        'peak_heap_kb': round(max(peaks) / 1024, 1) if peaks else 0,
+        'text_chars': chars,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help='Directory of saved .html pages')
+    parser.add_argument('--backends', default=','.join(EXTRACTORS), help='Comma-separated backends to compare')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per page; the median is reported')
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        parser.error(f"No .html files found in {args.corpus}")
+
+    if args.single:
+        # Child process: measure one backend so max RSS is attributable to it
+        print(json.dumps(run_backend(args.single, pages, args.repeat)))
+        return
+
+    rows = []
+    for backend in args.backends.split(','):
+        backend = backend.strip()
+        if backend not in EXTRACTORS:
+            print(f"Skipping unknown backend: {backend}")
+            continue
+        proc = subprocess.run(
+            [sys.executable, __file__, args.corpus, '--single', backend, '--repeat', str(args.repeat)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip()}")
+            continue
+        rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    header = f"{'backend':<8} {'pages':>5} {'median ms':>10} {'total ms':>10} {'peak heap KB':>13} {'max RSS KB':>11} {'text chars':>11}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['backend']:<8} {row['pages']:>5} {row['median_ms']:>10} {row['total_ms']:>10} "
+              f"{row['peak_heap_kb']:>13} {row['max_rss_kb']:>11} {row['text_chars']:>11}")
+
+if __name__ == '__main__':
+    main()
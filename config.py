@@ -11,6 +11,10 @@ logging.basicConfig(
 # Load environment variables from .env file
 load_dotenv()
 
+def model_chain(env_name, default):
+    """Comma-separated model names from an environment variable, in fallback order."""
+    return [model.strip() for model in os.environ.get(env_name, default).split(',') if model.strip()]
+
 class Config:
     """Base configuration."""
     # Check if we're in debug mode
@@ -21,8 +25,8 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 5,
-        'max_overflow': 10,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
         'pool_timeout': 30,
         'pool_recycle': 1800
     }
@@ -48,11 +52,129 @@ class Config:
     
     # Default OpenAI model
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
+
+    # Models by workflow phase, e.g. RESEARCH_MODEL=gpt-4o-mini,gpt-4o. When a call
+    # fails the next model in the chain is tried. Task names from utils/prompts.py
+    # (e.g. 'EDITORIAL_SUMMARY') may be added to route part of a phase. Phases that
+    # share a prompt prefix only share the provider's prompt cache on the same model.
+    MODEL_ROUTES = {
+        'RESEARCH': model_chain('RESEARCH_MODEL', OPENAI_MODEL),
+        'ANALYSIS': model_chain('ANALYSIS_MODEL', OPENAI_MODEL),
+        'STRATEGY': model_chain('STRATEGY_MODEL', OPENAI_MODEL),
+        'CONTENT_IDEATION': model_chain('CONTENT_IDEATION_MODEL', OPENAI_MODEL),
+        'EDITORIAL': model_chain('EDITORIAL_MODEL', OPENAI_MODEL)
+    }
+
+    # OpenAI client connection pool
+    OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 60))
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 120))
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 10))
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 2))
     
     # Application settings
     MAX_WEBSITE_CONTENT_LENGTH = int(os.environ.get('MAX_WEBSITE_CONTENT_LENGTH', 20000))
     RESULTS_PER_KEYWORD = int(os.environ.get('RESULTS_PER_KEYWORD', 5))
-    
+
+    # Identical submissions (same URL and keyword set) within this many seconds
+    # reuse a finished job's research and themes unless the form asks for a
+    # fresh run; 0 (the default) disables reuse
+    JOB_DEDUP_WINDOW = int(os.environ.get('JOB_DEDUP_WINDOW', 0))
+
+    # CONTENT_IDEATION and EDITORIAL agent calls run at once, one per pillar topic
+    PILLAR_CONCURRENCY = int(os.environ.get('PILLAR_CONCURRENCY', 4))
+
+    # Speculative STRATEGY runs for the leading themes while the user is choosing one
+    SPECULATIVE_STRATEGY = os.environ.get('SPECULATIVE_STRATEGY', 'False').lower() in ('true', '1', 't')
+    SPECULATIVE_STRATEGY_THEMES = int(os.environ.get('SPECULATIVE_STRATEGY_THEMES', 3))
+    SPECULATIVE_STRATEGY_CONCURRENCY = int(os.environ.get('SPECULATIVE_STRATEGY_CONCURRENCY', 3))  # branch threads per process, shared by all jobs
+    SPECULATIVE_STRATEGY_TOKEN_BUDGET = int(os.environ.get('SPECULATIVE_STRATEGY_TOKEN_BUDGET', 30000))  # estimated prompt + output tokens per job
+    SPECULATIVE_STRATEGY_WAIT = float(os.environ.get('SPECULATIVE_STRATEGY_WAIT', 60))  # seconds a selection waits for its running branch
+
+    # Input token budgets for the variable context (page content, prior outputs) of each agent prompt.
+    # Tokens are counted with tiktoken, which downloads its encoding file on first use; without
+    # network access, point TIKTOKEN_CACHE_DIR at a directory holding the cached file, or counts
+    # fall back to an estimate from the text length.
+    CONTEXT_TOKEN_BUDGETS = {
+        'RESEARCH': int(os.environ.get('RESEARCH_CONTEXT_TOKENS', 6000)),
+        'ANALYSIS': int(os.environ.get('ANALYSIS_CONTEXT_TOKENS', 3000)),
+        'SHARED': int(os.environ.get('SHARED_CONTEXT_TOKENS', 2000)),  # brand brief shared by the tasks after theme selection
+        'CONTENT_IDEATION': int(os.environ.get('CONTENT_IDEATION_CONTEXT_TOKENS', 5000)),
+        'EDITORIAL': int(os.environ.get('EDITORIAL_CONTEXT_TOKENS', 10000))
+    }
+    SEARCH_CONTEXT_TOKENS = int(os.environ.get('SEARCH_CONTEXT_TOKENS', 1500))  # part of the RESEARCH budget
+
+    # Bearer token for the job listing and stats endpoints (/api/jobs, /api/*-stats,
+    # /api/llm-usage, /api/phase-metrics); they are disabled when unset
+    ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN')
+
+    # Job listing API page sizes
+    JOB_LIST_PAGE_SIZE = int(os.environ.get('JOB_LIST_PAGE_SIZE', 50))
+    JOB_LIST_MAX_PAGE_SIZE = int(os.environ.get('JOB_LIST_MAX_PAGE_SIZE', 200))
+
+    # Shared HTTP session for scraping and search
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # hosts with pooled connections
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # keep-alive connections per host
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))
+    HTTP_PER_HOST_CONCURRENCY = int(os.environ.get('HTTP_PER_HOST_CONCURRENCY', 8))
+
+    # Website scraping ('single' page or multi-page 'crawl')
+    SCRAPE_MODE = os.environ.get('SCRAPE_MODE', 'single')
+    CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', 10))
+    CRAWL_MAX_DEPTH = int(os.environ.get('CRAWL_MAX_DEPTH', 2))
+    CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 4))
+    CRAWL_RATE_LIMIT = float(os.environ.get('CRAWL_RATE_LIMIT', 4))  # requests per second per host
+    CRAWL_USE_SITEMAP = os.environ.get('CRAWL_USE_SITEMAP', 'True').lower() in ('true', '1', 't')
+
+    # HTML extraction backend (the reference 'bs4', 'lxml' or 'stream' single-pass);
+    # compare them on your own pages with benchmarks/bench_extract.py before switching
+    SCRAPE_EXTRACTOR = os.environ.get('SCRAPE_EXTRACTOR', 'bs4')
+    SCRAPE_MAX_BYTES = int(os.environ.get('SCRAPE_MAX_BYTES', 2 * 1024 * 1024))
+    # The 'stream' extractor stops reading a page once it has MAX_WEBSITE_CONTENT_LENGTH of main
+    # text; 'bs4' and 'lxml' only see the text after parsing, so they stop at this many bytes
+    SCRAPE_EARLY_STOP_BYTES = int(os.environ.get('SCRAPE_EARLY_STOP_BYTES', 512 * 1024))
+
+    # Scraped page cache ('memory', 'sqlite', 'redis' or 'none'); pages are served
+    # without a request for SCRAPE_CACHE_TTL, then revalidated until SCRAPE_CACHE_MAX_AGE
+    SCRAPE_CACHE_BACKEND = os.environ.get('SCRAPE_CACHE_BACKEND', 'memory')
+    SCRAPE_CACHE_TTL = int(os.environ.get('SCRAPE_CACHE_TTL', 3600))
+    SCRAPE_CACHE_MAX_AGE = int(os.environ.get('SCRAPE_CACHE_MAX_AGE', 604800))
+    SCRAPE_CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPE_CACHE_MAX_ENTRIES', 1000))
+    SCRAPE_CACHE_MAX_BYTES = int(os.environ.get('SCRAPE_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+    # Keyword search fan-out
+    SEARCH_CONCURRENCY = int(os.environ.get('SEARCH_CONCURRENCY', 5))
+    SERPAPI_RATE_LIMIT = float(os.environ.get('SERPAPI_RATE_LIMIT', 5))  # requests per second
+
+    # SERP result cache ('memory', 'sqlite', 'redis' or 'none')
+    SERP_CACHE_BACKEND = os.environ.get('SERP_CACHE_BACKEND', 'memory')
+    SERP_CACHE_TTL = int(os.environ.get('SERP_CACHE_TTL', 86400))
+    SERP_CACHE_STALE_TTL = int(os.environ.get('SERP_CACHE_STALE_TTL', 0))  # stale-while-revalidate window
+    SERP_CACHE_MAX_ENTRIES = int(os.environ.get('SERP_CACHE_MAX_ENTRIES', 5000))
+    # LLM response cache ('memory', 'sqlite', 'redis' or 'none')
+    LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'memory')
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 604800))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 500))
+    LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'cache.sqlite3'))
+
+    # Background job execution ('inline', 'thread', 'asyncio' or 'celery')
+    JOB_EXECUTOR = os.environ.get('JOB_EXECUTOR', 'thread')
+    JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 4))
+    # Jobs in flight per event loop; capped at the database pool (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    JOB_ASYNC_CONCURRENCY = int(os.environ.get('JOB_ASYNC_CONCURRENCY', 15))
+    JOB_ASYNC_WORKFLOW = os.environ.get('JOB_ASYNC_WORKFLOW', 'False').lower() in ('true', '1', 't')  # Celery tasks run the async workflow
+    REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
+    CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', REDIS_URL)
+
+    # Live job output ('memory' for in-process workers, 'redis' when workers run elsewhere)
+    LIVE_CHANNEL_BACKEND = os.environ.get('LIVE_CHANNEL_BACKEND', 'redis' if JOB_EXECUTOR == 'celery' else 'memory')
+    LIVE_STREAM_MAX_SECONDS = int(os.environ.get('LIVE_STREAM_MAX_SECONDS', 300))
+
     # Security settings
     WTF_CSRF_ENABLED = True
     
@@ -65,7 +187,12 @@ class Config:
         logging.info(f"- Database URI: {Config.SQLALCHEMY_DATABASE_URI}")
         logging.info(f"- OpenAI API key set: {'Yes' if Config.OPENAI_API_KEY else 'No'}")
         logging.info(f"- SerpAPI key set: {'Yes' if Config.SERPAPI_API_KEY else 'No'}")
+        logging.info(f"- Admin API enabled: {'Yes' if Config.ADMIN_API_TOKEN else 'No'}")
         logging.info(f"- Using OpenAI model: {Config.OPENAI_MODEL}")
+        for phase, models in Config.MODEL_ROUTES.items():
+            if models != [Config.OPENAI_MODEL]:
+                logging.info(f"- {phase} models: {', '.join(models)}")
+        logging.info(f"- Job executor: {Config.JOB_EXECUTOR} ({Config.JOB_WORKER_CONCURRENCY} workers)")
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the web processes.
+
+Run with:
+
+    gunicorn app:app
+
+Every open /job-stream/<job_id> connection and /job-status/<job_id>/updates
+long poll holds a worker thread until it ends (at most LIVE_STREAM_MAX_SECONDS),
+so the web processes use the threaded worker class with enough threads for the
+processing pages expected to be open at once. Threads rather than gevent keep
+the in-process job executor's thread pool and event loop working unpatched.
+
+With the 'memory' live channel, the workflow and its streams must share one
+process; run more than one web process only with LIVE_CHANNEL_BACKEND=redis.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))  # open streams and requests per process
+
+# Streams hold their thread, not the worker's heartbeat, so this only
+# catches a stuck process
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
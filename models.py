@@ -1,16 +1,80 @@
+import re
+import json
+import base64
+import hashlib
 from datetime import datetime
+from urllib.parse import urlparse
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.collections import attribute_keyed_dict
 
 db = SQLAlchemy()
 
+def normalize_domain(url_or_host):
+    """Lower-cased host of a URL (or bare host name) without a leading 'www.'."""
+    value = (url_or_host or '').strip().lower()
+    host = urlparse(value if '://' in value else f"//{value}").hostname or ''
+    return host.removeprefix('www.')
+
+def split_keywords(keywords):
+    """Keywords split on newlines or commas, as entered in the form."""
+    return [k.strip() for k in re.split(r'[\n,]', keywords or '') if k.strip()]
+
+def submission_fingerprint(website_url, keywords):
+    """
+    Identify submissions that would produce the same research
+
+    The URL is reduced to its domain (see normalize_domain), path without a
+    trailing slash and query; keywords are compared as a case-insensitive set.
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    parts = urlparse((website_url or '').strip())
+    url = normalize_domain(website_url) + parts.path.rstrip('/')
+    if parts.query:
+        url += f"?{parts.query}"
+    keyword_set = sorted({' '.join(k.lower().split()) for k in split_keywords(keywords)})
+    return hashlib.sha256(json.dumps([url, keyword_set]).encode('utf-8')).hexdigest()
+
+# JSONB on Postgres: stored parsed and indexable with GIN. Other databases
+# (SQLite in the benchmarks) fall back to plain JSON.
+JSON = JSONB().with_variant(db.JSON(), 'sqlite')
+
+def _artifact(name):
+    """Expose a job artifact as a plain attribute; artifacts are only loaded when accessed."""
+    def get(self):
+        artifact = self.artifacts.get(name)
+        return artifact.content if artifact is not None else None
+
+    def set(self, value):
+        artifact = self.artifacts.get(name)
+        if artifact is None:
+            self.artifacts[name] = JobArtifact(name=name, content=value)
+        else:
+            artifact.content = value
+
+    return property(get, set)
+
 class Job(db.Model):
     """Represents a content planning job."""
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Keyset pagination of the job listing, newest first, optionally filtered
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_jobs_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_jobs_website_domain_created_at_id', 'website_domain', 'created_at', 'id'),
+        # Recent jobs for the same submission (see find_reusable)
+        db.Index('ix_jobs_fingerprint_created_at', 'fingerprint', 'created_at'),
+    )
 
     id = db.Column(db.String(36), primary_key=True)
     website_url = db.Column(db.String(500), nullable=False)
+    website_domain = db.Column(db.String(255))
     keywords = db.Column(db.Text, nullable=False)
+    fingerprint = db.Column(db.String(64))  # submission_fingerprint() of the URL and keywords
     status = db.Column(db.String(20), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -18,30 +82,242 @@ class Job(db.Model):
     error_message = db.Column(db.Text)
     workflow_state = db.Column(JSON)
 
+    # Progress, read on every status poll
+    current_phase = db.Column(db.String(30))
+    progress = db.Column(db.Integer, default=0)
+    event_seq = db.Column(db.Integer, default=0)  # seq of the last row in job_events
+    completed_at = db.Column(db.DateTime)
+
+    # Small results the processing and results pages show directly
+    content_themes = db.Column(JSON)
+    selected_theme = db.Column(JSON)
+    website_content_length = db.Column(db.Integer)
+    search_results_count = db.Column(db.Integer)
+
+    # Large phase outputs, stored in job_artifacts
+    artifacts = db.relationship('JobArtifact', collection_class=attribute_keyed_dict('name'),
+                                cascade='all, delete-orphan', lazy='select')
+
+    search_results = _artifact('search_results')
+    brand_brief = _artifact('brand_brief')
+    search_analysis = _artifact('search_analysis')
+    content_cluster = _artifact('content_cluster')
+    article_ideas = _artifact('article_ideas')
+    final_plan = _artifact('final_plan')
+    # STRATEGY output precomputed per candidate theme, see speculate_strategy()
+    speculative_strategy = _artifact('speculative_strategy')
+
+    ARTIFACTS = ('search_results', 'brand_brief', 'search_analysis', 'content_cluster',
+                 'article_ideas', 'final_plan')
+
     def __init__(self, job_id, website_url, keywords):
         self.id = job_id
         self.website_url = website_url
+        self.website_domain = normalize_domain(website_url)
         self.keywords = keywords
+        self.fingerprint = submission_fingerprint(website_url, keywords)
         self.status = 'pending'
+        self.progress = 0
+        self.event_seq = 0
         self.workflow_state = {}
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_artifacts=True):
+        data = {
             'id': self.id,
             'website_url': self.website_url,
+            'website_domain': self.website_domain,
             'keywords': self.keywords,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'current_phase': self.current_phase,
+            'progress': self.progress,
+            'messages': self.messages,
+            'last_event_seq': self.event_seq,
+            'content_themes': self.content_themes,
+            'selected_theme': self.selected_theme,
+            'website_content_length': self.website_content_length,
+            'search_results_count': self.search_results_count,
             'results': self.results,
             'error_message': self.error_message,
             'workflow_state': self.workflow_state
         }
+        if include_artifacts:
+            for name in self.ARTIFACTS:
+                data[name] = getattr(self, name)
+        return data
+
+    @property
+    def messages(self):
+        """All progress messages, oldest first."""
+        return [event.message for event in JobEvent.since(self.id, kind='message')]
+
+    def add_event(self, message=None, kind='message', data=None):
+        """
+        Append an event to the job's log
+
+        The sequence number is claimed with an atomic UPDATE ... RETURNING on
+        the job row, so concurrent writers for one job (a repeated theme
+        selection racing the workflow) queue on the row lock instead of
+        colliding on the job_events key. The event row is inserted with the
+        next commit, and the row stays locked until then, so commit promptly.
+
+        Args:
+            message (str): Human-readable progress message
+            kind (str): 'message' or 'transition'
+            data (dict): Optional structured payload
+
+        Returns:
+            int: The event's sequence number within the job
+        """
+        seq = db.session.execute(
+            update(Job).where(Job.id == self.id)
+            .values(event_seq=func.coalesce(Job.event_seq, 0) + 1)
+            .returning(Job.event_seq)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        # Keep the loaded value in step without the ORM writing it back
+        set_committed_value(self, 'event_seq', seq)
+        db.session.add(JobEvent(job_id=self.id, seq=seq, kind=kind, message=message, data=data))
+        return seq
+
+    @property
+    def keyword_list(self):
+        """Keywords split on newlines or commas, as entered in the form."""
+        return split_keywords(self.keywords)
 
     @classmethod
     def get_by_id(cls, job_id):
         return cls.query.get(job_id)
 
+    @classmethod
+    def claim(cls, job_id, from_status, to_status):
+        """
+        Move a job to a new status, but only if it still has the expected one
+
+        The check and the change are one UPDATE, so of several concurrent
+        callers exactly one succeeds. Commits.
+
+        Args:
+            job_id (str): The job ID
+            from_status (str): Status the job must have
+            to_status (str): Status to give it
+
+        Returns:
+            bool: True if this caller moved the job
+        """
+        result = db.session.execute(
+            update(cls).where(cls.id == job_id, cls.status == from_status)
+            .values(status=to_status)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def get_status(cls, job_id, fields=None):
+        """
+        Load a slim projection of a job, selecting only the requested columns
+
+        Args:
+            job_id (str): The job ID
+            fields (list): Field names from STATUS_COLUMNS (defaults to SUMMARY_FIELDS)
+
+        Returns:
+            dict: The selected fields, or None if the job does not exist
+        """
+        names = [name for name in (fields or SUMMARY_FIELDS) if name in STATUS_COLUMNS]
+        if 'id' not in names:
+            names.insert(0, 'id')
+
+        row = db.session.query(*[STATUS_COLUMNS[name] for name in names]).filter(cls.id == job_id).first()
+        if row is None:
+            return None
+
+        status = {}
+        for name, value in zip(names, row):
+            status[name] = value.isoformat() if isinstance(value, datetime) else value
+        return status
+
+    @classmethod
+    def find_reusable(cls, fingerprint, since):
+        """
+        Most recent job for the same submission whose research can be reused
+
+        Args:
+            fingerprint (str): submission_fingerprint() of the new submission
+            since (datetime): Oldest creation time still considered fresh
+
+        Returns:
+            Job: A job that has identified at least one content theme, or None
+        """
+        candidates = (cls.query
+                      .filter(cls.fingerprint == fingerprint, cls.created_at >= since,
+                              cls.content_themes.isnot(None), cls.status != 'error')
+                      .order_by(cls.created_at.desc())
+                      .limit(5))
+        # A failed theme parse is stored as [] or a JSON null, which isnot(None) lets through
+        for job in candidates:
+            if job.content_themes:
+                return job
+        return None
+
+    @classmethod
+    def list_page(cls, status=None, domain=None, created_after=None, created_before=None,
+                  cursor=None, limit=50, fields=None):
+        """
+        One page of jobs, newest first, as slim projections
+
+        Uses keyset pagination on (created_at, id), so every page costs the
+        same however deep it is, served by the composite created_at/id indexes.
+
+        Args:
+            status (list): Only jobs in these statuses
+            domain (str): Only jobs for this site (URL or host, 'www.' ignored)
+            created_after (datetime): Only jobs created at or after this time
+            created_before (datetime): Only jobs created before this time
+            cursor (str): next_cursor from the previous page
+            limit (int): Page size
+            fields (list): Field names from STATUS_COLUMNS (defaults to LIST_FIELDS)
+
+        Returns:
+            tuple: (list of job dicts, next_cursor or None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        names = [name for name in (fields or LIST_FIELDS) if name in STATUS_COLUMNS]
+        for required in ('id', 'created_at'):
+            if required not in names:
+                names.append(required)
+
+        query = db.session.query(*[STATUS_COLUMNS[name] for name in names])
+        if status:
+            query = query.filter(cls.status.in_(status))
+        if domain:
+            query = query.filter(cls.website_domain == normalize_domain(domain))
+        if created_after:
+            query = query.filter(cls.created_at >= created_after)
+        if created_before:
+            query = query.filter(cls.created_at < created_before)
+        if cursor:
+            created_at, job_id = decode_cursor(cursor)
+            query = query.filter(tuple_(cls.created_at, cls.id) < (created_at, job_id))
+
+        rows = query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit + 1).all()
+
+        jobs = []
+        for row in rows[:limit]:
+            jobs.append({name: value.isoformat() if isinstance(value, datetime) else value
+                         for name, value in zip(names, row)})
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[names.index('created_at')], last[names.index('id')])
+        return jobs, next_cursor
+
     def update_status(self, status, error_message=None):
         self.status = status
         if error_message:
@@ -55,4 +331,97 @@ class Job(db.Model):
     def update_results(self, results):
         self.results = results
         self.status = 'completed'
-        db.session.commit() 
\ No newline at end of file
+        db.session.commit()
+
+class JobArtifact(db.Model):
+    """A large output of a workflow phase (brand brief, content cluster, final plan, ...)."""
+    __tablename__ = 'job_artifacts'
+
+    job_id = db.Column(db.String(36), db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    name = db.Column(db.String(50), primary_key=True)
+    content = db.Column(JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class JobEvent(db.Model):
+    """One entry in a job's append-only progress log."""
+    __tablename__ = 'job_events'
+
+    job_id = db.Column(db.String(36), db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    kind = db.Column(db.String(20), nullable=False, default='message')
+    message = db.Column(db.Text)
+    data = db.Column(JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'kind': self.kind,
+            'message': self.message,
+            'data': self.data,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @classmethod
+    def since(cls, job_id, seq=0, kind=None, limit=None):
+        """
+        Events of a job after the given sequence number, oldest first
+
+        Args:
+            job_id (str): The job ID
+            seq (int): Sequence number of the last event already seen
+            kind (str): Optional event kind to filter on
+            limit (int): Optional maximum number of events
+
+        Returns:
+            list: JobEvent rows
+        """
+        query = cls.query.filter(cls.job_id == job_id, cls.seq > seq)
+        if kind:
+            query = query.filter(cls.kind == kind)
+        query = query.order_by(cls.seq)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+def encode_cursor(created_at, job_id):
+    """Opaque keyset cursor for the job listing."""
+    raw = json.dumps([created_at.isoformat(), job_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError if the cursor is malformed."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), str(job_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+# Columns available to status projections, by output field name
+STATUS_COLUMNS = {
+    'id': Job.id,
+    'website_url': Job.website_url,
+    'website_domain': Job.website_domain,
+    'keywords': Job.keywords,
+    'status': Job.status,
+    'created_at': Job.created_at,
+    'updated_at': Job.updated_at,
+    'error_message': Job.error_message,
+    'current_phase': Job.current_phase,
+    'progress': Job.progress,
+    'last_event_seq': Job.event_seq,
+    'completed_at': Job.completed_at,
+    'content_themes': Job.content_themes,
+    'selected_theme': Job.selected_theme,
+    'website_content_length': Job.website_content_length,
+    'search_results_count': Job.search_results_count
+}
+
+# Fields the processing page needs on every poll
+SUMMARY_FIELDS = ('id', 'status', 'current_phase', 'progress', 'events', 'last_event_seq',
+                  'content_themes', 'error_message', 'updated_at')
+
+# Fields returned for each job in the job listing
+LIST_FIELDS = ('id', 'website_url', 'website_domain', 'status', 'current_phase', 'progress',
+               'created_at', 'updated_at', 'completed_at')
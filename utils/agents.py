@@ -1,20 +1,191 @@
 import os
 import json
+import hashlib
 import logging
+import threading
 from flask import current_app
+from utils.cache import create_cache
+from utils.llm_client import get_openai_client, get_async_openai_client
+from utils.speculation import BranchCancelled
 
-def run_agent_with_openai(system_message, user_message, model=None):
+# LLM response cache, set up by configure_llm_cache()
+_llm_cache = None
+
+# Token usage reported by the API, including prompt tokens served from the provider's prompt cache
+_usage = {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+_usage_lock = threading.Lock()
+
+def configure_llm_cache(config):
+    """
+    Set up the LLM response cache from app config
+    
+    Args:
+        config (dict): Flask app config
+    """
+    global _llm_cache
+    _llm_cache = create_cache(
+        'llm',
+        backend=config.get('LLM_CACHE_BACKEND', 'memory'),
+        ttl=config.get('LLM_CACHE_TTL', 604800),
+        max_entries=config.get('LLM_CACHE_MAX_ENTRIES', 500),
+        max_bytes=config.get('LLM_CACHE_MAX_BYTES'),
+        sqlite_path=config.get('CACHE_SQLITE_PATH'),
+        redis_url=config.get('REDIS_URL')
+    )
+
+def _llm_cache_key(model, system_message, user_message, temperature, max_tokens, context=None):
+    """Hash everything that determines the completion into a cache key."""
+    parts = [model, system_message, user_message, temperature, max_tokens]
+    if context is not None:
+        parts.append(context)
+    payload = json.dumps(parts)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _build_messages(system_message, user_message, context=None):
+    """
+    Chat messages for an agent call
+    
+    Shared context goes in its own user message between the system message and
+    the request, so calls that share both form a byte-identical prefix that the
+    provider can serve from its prompt cache.
+    """
+    messages = [{"role": "system", "content": system_message}]
+    if context is not None:
+        messages.append({"role": "user", "content": context})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+def _record_usage(usage, on_usage=None):
+    """Add an API response's token usage to the totals and pass it to the caller's callback."""
+    if usage is None:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    counts = {
+        'prompt_tokens': usage.prompt_tokens or 0,
+        'cached_tokens': getattr(details, 'cached_tokens', None) or 0,
+        'completion_tokens': usage.completion_tokens or 0
+    }
+    with _usage_lock:
+        _usage['calls'] += 1
+        for name, count in counts.items():
+            _usage[name] += count
+    logging.debug(f"OpenAI usage: {counts['prompt_tokens']} prompt tokens "
+                 f"({counts['cached_tokens']} cached), {counts['completion_tokens']} completion tokens")
+    if on_usage is not None:
+        on_usage(counts)
+
+def get_llm_usage_stats():
+    """Token totals since startup, with the share of prompt tokens served from the prompt cache."""
+    with _usage_lock:
+        stats = dict(_usage)
+    stats['cached_ratio'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 3) if stats['prompt_tokens'] else 0.0
+    return stats
+
+def _is_cacheable(content):
+    """Only successful completions are cached, never error or empty responses."""
+    return bool(content) and not content.startswith("Error") and content != "No response generated."
+
+def run_agent_with_openai(system_message, user_message, model=None, temperature=0.7,
+                          max_tokens=4000, use_cache=True, on_delta=None, context=None, on_usage=None):
     """
     Run an agent with OpenAI API
     
+    Identical requests are answered from the LLM response cache when it is enabled.
+    
     Args:
         system_message (str): The system message that sets agent behavior
         user_message (str): The user message/query
         model (str): Optional model override
+        temperature (float): Sampling temperature
+        max_tokens (int): Maximum tokens to generate
+        use_cache (bool): Set to False to bypass the response cache for this call
+        on_delta (callable): Optional callback receiving text as it is generated;
+            enables streaming. On a cache hit it receives the whole response once.
+        context (str): Optional context shared by several calls, sent between the
+            system message and the user message
+        on_usage (callable): Optional callback receiving the API's token counts
+            (prompt_tokens, cached_tokens, completion_tokens); not called on a cache hit
     
     Returns:
         str: The agent's response content
     """
+    # Use model from config if not specified
+    if not model:
+        model = current_app.config.get('OPENAI_MODEL') or 'gpt-4o'
+    
+    def compute():
+        return _run_agent_uncached(system_message, user_message, model, temperature,
+                                   max_tokens, on_delta, context, on_usage)
+    
+    if _llm_cache is None or not use_cache:
+        return compute()
+    
+    streamed = []
+    
+    def compute_and_mark():
+        streamed.append(True)
+        return compute()
+    
+    content = _llm_cache.get_or_compute(
+        _llm_cache_key(model, system_message, user_message, temperature, max_tokens, context),
+        compute_and_mark,
+        should_store=_is_cacheable
+    )
+    
+    # Cached responses were never streamed, so hand them over in one piece
+    if on_delta is not None and not streamed:
+        on_delta(content)
+    
+    return content
+
+def stream_agent_with_openai(system_message, user_message, model=None, temperature=0.7,
+                             max_tokens=4000, context=None, on_usage=None):
+    """
+    Run an agent with OpenAI API, yielding the response as it is generated
+    
+    Args:
+        system_message (str): The system message that sets agent behavior
+        user_message (str): The user message/query
+        model (str): Optional model override
+        temperature (float): Sampling temperature
+        max_tokens (int): Maximum tokens to generate
+        context (str): Optional shared context, see run_agent_with_openai()
+        on_usage (callable): Optional callback receiving the token counts at the end
+    
+    Yields:
+        str: Pieces of the response text, in order
+    """
+    api_key = current_app.config.get('OPENAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OpenAI API key not found in environment or app config")
+    
+    if not model:
+        model = current_app.config.get('OPENAI_MODEL') or 'gpt-4o'
+    
+    client = get_openai_client(api_key, current_app.config)
+    logging.info(f"Making streaming OpenAI API call with model: {model}")
+    
+    stream = client.chat.completions.create(
+        model=model,
+        messages=_build_messages(system_message, user_message, context),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, 'usage', None) is not None:
+                _record_usage(chunk.usage, on_usage)
+    finally:
+        stream.close()
+
+def _run_agent_uncached(system_message, user_message, model, temperature, max_tokens,
+                        on_delta=None, context=None, on_usage=None):
+    """Call the OpenAI API directly, without consulting the response cache."""
     try:
         # Get API key from app config or environment
         api_key = current_app.config.get('OPENAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
@@ -23,61 +194,39 @@ def run_agent_with_openai(system_message, user_message, model=None):
             logging.error("OpenAI API key not found in environment or app config")
             return "Error: OpenAI API key not found. Please add your API key to the .env file."
         
-        # Use model from config if not specified
-        if not model:
-            model = current_app.config.get('OPENAI_MODEL') or 'gpt-4o'
-            
-        logging.info(f"Using OpenAI model: {model}")
+        # Stream the response through the callback when one is given
+        if on_delta is not None:
+            parts = []
+            for delta in stream_agent_with_openai(system_message, user_message, model,
+                                                  temperature, max_tokens, context, on_usage):
+                parts.append(delta)
+                on_delta(delta)
+            return ''.join(parts) or "No response generated."
         
-        try:
-            # Import here to avoid initial loading issues
-            from openai import OpenAI
-            
-            # Initialize OpenAI client - make sure to not pass any unexpected params
-            client = OpenAI(api_key=api_key)
-            
-            # Log request information (for debugging)
-            logging.info(f"Making OpenAI API call with model: {model}")
-            
-            # Make API call
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            
-            # Extract and return the content
-            if hasattr(response, 'choices') and response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content
-            
-            return "No response generated."
-            
-        except ImportError:
-            # Fall back to older client if necessary
-            logging.warning("Using alternative OpenAI client method")
-            
-            import openai
-            openai.api_key = api_key
-            
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            
-            # Extract and return the content
-            if 'choices' in response and len(response['choices']) > 0:
-                return response['choices'][0]['message']['content']
-            
-            return "No response generated."
+        # Reuse the process-wide client and its connection pool
+        client = get_openai_client(api_key, current_app.config)
+        
+        # Log request information (for debugging)
+        logging.info(f"Making OpenAI API call with model: {model}")
+        
+        # Make API call
+        response = client.chat.completions.create(
+            model=model,
+            messages=_build_messages(system_message, user_message, context),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        _record_usage(getattr(response, 'usage', None), on_usage)
+        
+        # Extract and return the content
+        if hasattr(response, 'choices') and response.choices and len(response.choices) > 0:
+            return response.choices[0].message.content
+        
+        return "No response generated."
+    
+    except BranchCancelled:
+        # A speculative caller stopped the stream on purpose
+        raise
     
     except Exception as e:
         # Log the error in production
@@ -87,26 +236,116 @@ def run_agent_with_openai(system_message, user_message, model=None):
         import traceback
         logging.error(traceback.format_exc())
         
-        # Try a simpler alternative approach that's less likely to have compatibility issues
-        try:
-            logging.info("Attempting alternative API call approach")
-            import openai
-            openai.api_key = api_key
-            
-            response = openai.chat.completions.create(
+        return f"Error generating content: {str(e)}"
+
+async def run_agent_with_openai_async(system_message, user_message, model=None, temperature=0.7,
+                                      max_tokens=4000, use_cache=True, on_delta=None, context=None,
+                                      on_usage=None):
+    """
+    Run an agent with the async OpenAI client
+    
+    Same caching, streaming and error handling as run_agent_with_openai(),
+    for use from an event loop.
+    
+    Args:
+        system_message (str): The system message that sets agent behavior
+        user_message (str): The user message/query
+        model (str): Optional model override
+        temperature (float): Sampling temperature
+        max_tokens (int): Maximum tokens to generate
+        use_cache (bool): Set to False to bypass the response cache for this call
+        on_delta (callable): Optional (non-async) callback receiving text as it is generated
+        context (str): Optional shared context, see run_agent_with_openai()
+        on_usage (callable): Optional (non-async) callback receiving the token counts
+    
+    Returns:
+        str: The agent's response content
+    """
+    if not model:
+        model = current_app.config.get('OPENAI_MODEL') or 'gpt-4o'
+    
+    async def compute():
+        return await _run_agent_uncached_async(system_message, user_message, model, temperature,
+                                               max_tokens, on_delta, context, on_usage)
+    
+    if _llm_cache is None or not use_cache:
+        return await compute()
+    
+    streamed = []
+    
+    async def compute_and_mark():
+        streamed.append(True)
+        return await compute()
+    
+    content = await _llm_cache.get_or_compute_async(
+        _llm_cache_key(model, system_message, user_message, temperature, max_tokens, context),
+        compute_and_mark,
+        should_store=_is_cacheable
+    )
+    
+    if on_delta is not None and not streamed:
+        on_delta(content)
+    
+    return content
+
+async def _run_agent_uncached_async(system_message, user_message, model, temperature, max_tokens,
+                                    on_delta=None, context=None, on_usage=None):
+    """Async version of _run_agent_uncached()."""
+    try:
+        api_key = current_app.config.get('OPENAI_API_KEY') or os.environ.get('OPENAI_API_KEY')
+        
+        if not api_key:
+            logging.error("OpenAI API key not found in environment or app config")
+            return "Error: OpenAI API key not found. Please add your API key to the .env file."
+        
+        client = get_async_openai_client(api_key, current_app.config)
+        messages = _build_messages(system_message, user_message, context)
+        
+        if on_delta is not None:
+            logging.info(f"Making streaming async OpenAI API call with model: {model}")
+            stream = await client.chat.completions.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=4000
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
             )
-            
+            parts = []
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        on_delta(chunk.choices[0].delta.content)
+                    if getattr(chunk, 'usage', None) is not None:
+                        _record_usage(chunk.usage, on_usage)
+            finally:
+                await stream.close()
+            return ''.join(parts) or "No response generated."
+        
+        logging.info(f"Making async OpenAI API call with model: {model}")
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        _record_usage(getattr(response, 'usage', None), on_usage)
+        
+        if response.choices:
             return response.choices[0].message.content
-        except Exception as fallback_error:
-            logging.error(f"Alternative approach also failed: {str(fallback_error)}")
-            return f"Error generating content: {str(e)}"
+        
+        return "No response generated."
+    
+    except BranchCancelled:
+        raise
+    
+    except Exception as e:
+        logging.error(f"Error calling OpenAI API: {str(e)}")
+        import traceback
+        logging.error(traceback.format_exc())
+        
+        return f"Error generating content: {str(e)}"
 
 # Alternative implementation using mock responses for testing without API
 def run_agent_with_mock(system_message, user_message, role=None):
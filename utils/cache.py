@@ -0,0 +1,454 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# All caches created through create_cache(), by name, for stats reporting
+_registry = {}
+_registry_lock = threading.Lock()
+
+# Shared pool for stale-while-revalidate refreshes
+_refresh_pool = None
+_refresh_pool_lock = threading.Lock()
+
+def _entry_size(value):
+    """Approximate the stored size of a JSON-serializable value in bytes."""
+    return len(json.dumps(value))
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count, total size and age."""
+
+    def __init__(self, max_entries=1000, max_bytes=None, max_age=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, stored_at, size = entry
+            if self.max_age and time.time() - stored_at > self.max_age:
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value, stored_at
+
+    def set(self, key, value):
+        size = _entry_size(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.time(), size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._data)))
+
+class SQLiteBackend:
+    """Local disk store in a SQLite file, evicted least-recently-used first."""
+
+    def __init__(self, path, namespace, max_entries=10000, max_bytes=None, max_age=None):
+        self.path = path
+        self.table = f"cache_{namespace}"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self.max_age and time.time() - stored_at > self.max_age:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            return json.loads(value), stored_at
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _evict(self):
+        if self.max_age:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE stored_at < ?", (time.time() - self.max_age,)
+            )
+
+        count, total = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+
+        if self.max_entries and count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+        if self.max_bytes and total > self.max_bytes:
+            # Drop the least recently used rows until we are back under budget
+            excess = total - self.max_bytes
+            rows = self._conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY accessed_at"
+            )
+            doomed = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+class RedisBackend:
+    """
+    Shared store in Redis
+
+    Entries expire after max_age. Size-bounded eviction is delegated to the
+    Redis server (configure maxmemory with an allkeys-lru policy).
+    """
+
+    def __init__(self, redis_url, namespace, max_age=None):
+        import redis
+
+        self.prefix = f"contentplan:cache:{namespace}:"
+        self.max_age = max_age
+        self._client = redis.Redis.from_url(redis_url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry['v'], entry['t']
+
+    def set(self, key, value):
+        payload = json.dumps({'v': value, 't': time.time()})
+        self._client.set(self.prefix + key, payload, ex=int(self.max_age) if self.max_age else None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+class Cache:
+    """
+    TTL cache policy on top of a storage backend
+
+    Entries younger than `ttl` are fresh. With `stale_ttl` set, entries up to
+    `ttl + stale_ttl` old are served immediately while a background refresh
+    replaces them (stale-while-revalidate). Backend errors are logged and
+    treated as misses so a cache outage never breaks the caller.
+    """
+
+    def __init__(self, name, backend, ttl=3600, stale_ttl=0):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'errors': 0}
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self.stats[counter] = self.stats.get(counter, 0) + 1
+
+    def record(self, counter):
+        """Increment a caller-defined counter reported alongside the built-in stats."""
+        self._count(counter)
+
+    def get(self, key, include_expired=False):
+        """
+        Look up a key
+
+        Args:
+            key (str): Cache key
+            include_expired (bool): Also return entries past their TTL (state 'expired'),
+                e.g. to revalidate them with a conditional request
+
+        Returns:
+            tuple: (value, state) where state is 'fresh' or 'stale', or None on a miss
+        """
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logging.warning(f"Cache '{self.name}' read failed: {str(e)}")
+            self._count('errors')
+            return None
+
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if self.ttl is None or age <= self.ttl:
+            return value, 'fresh'
+        if self.stale_ttl and age <= self.ttl + self.stale_ttl:
+            return value, 'stale'
+        if include_expired:
+            return value, 'expired'
+        return None
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logging.warning(f"Cache '{self.name}' write failed: {str(e)}")
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            logging.warning(f"Cache '{self.name}' delete failed: {str(e)}")
+            self._count('errors')
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_compute(self, key, compute, should_store=None):
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Args:
+            key (str): Cache key
+            compute (callable): Zero-argument function producing the value
+            should_store (callable): Optional predicate deciding whether a computed value is cached
+
+        Returns:
+            The cached or freshly computed value
+        """
+        cached = self.get(key)
+        if cached is not None:
+            value, state = cached
+            if state == 'fresh':
+                self._count('hits')
+            else:
+                self._count('stale_hits')
+                self._schedule_refresh(key, compute, should_store)
+            return value
+
+        self._count('misses')
+        value = compute()
+        if should_store is None or should_store(value):
+            self.set(key, value)
+        return value
+
+    def _schedule_refresh(self, key, compute, should_store):
+        """Recompute a stale entry in the background, once per key at a time."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = compute()
+                if should_store is None or should_store(value):
+                    self.set(key, value)
+                self._count('refreshes')
+            except Exception as e:
+                logging.warning(f"Cache '{self.name}' refresh failed: {str(e)}")
+                self._count('errors')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _get_refresh_pool().submit(refresh)
+
+    async def get_or_compute_async(self, key, compute, should_store=None):
+        """
+        Coroutine version of get_or_compute()
+
+        Args:
+            key (str): Cache key
+            compute (callable): Zero-argument coroutine function producing the value
+            should_store (callable): Optional predicate deciding whether a computed value is cached
+
+        Returns:
+            The cached or freshly computed value
+        """
+        cached = self.get(key)
+        if cached is not None:
+            value, state = cached
+            if state == 'fresh':
+                self._count('hits')
+            else:
+                self._count('stale_hits')
+                self._schedule_refresh_async(key, compute, should_store)
+            return value
+
+        self._count('misses')
+        value = await compute()
+        if should_store is None or should_store(value):
+            self.set(key, value)
+        return value
+
+    def _schedule_refresh_async(self, key, compute, should_store):
+        """Recompute a stale entry in a task on the running event loop, once per key at a time."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                value = await compute()
+                if should_store is None or should_store(value):
+                    self.set(key, value)
+                self._count('refreshes')
+            except Exception as e:
+                logging.warning(f"Cache '{self.name}' refresh failed: {str(e)}")
+                self._count('errors')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__
+        try:
+            stats['entries'] = len(self.backend)
+        except TypeError:
+            stats['entries'] = None
+        return stats
+
+def _get_refresh_pool():
+    global _refresh_pool
+    with _refresh_pool_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        return _refresh_pool
+
+def create_cache(name, backend='memory', ttl=3600, stale_ttl=0, max_entries=1000,
+                 max_bytes=None, max_age=None, sqlite_path=None, redis_url=None):
+    """
+    Create a named cache and register it for stats reporting
+
+    Args:
+        name (str): Cache name, also used as the storage namespace
+        backend (str): 'memory', 'sqlite', 'redis' or 'none'
+        ttl (int): Seconds an entry stays fresh
+        stale_ttl (int): Extra seconds a stale entry may be served while it is refreshed
+        max_entries (int): Maximum number of entries (memory/sqlite)
+        max_bytes (int): Maximum total size of stored values (memory/sqlite)
+        max_age (int): Hard expiry in seconds (defaults to ttl + stale_ttl)
+        sqlite_path (str): Database file for the sqlite backend
+        redis_url (str): Connection URL for the redis backend
+
+    Returns:
+        Cache: The cache, or None when the backend is 'none'
+    """
+    backend = (backend or 'none').lower()
+    if backend == 'none':
+        with _registry_lock:
+            _registry.pop(name, None)
+        return None
+
+    if max_age is None and ttl is not None:
+        max_age = ttl + (stale_ttl or 0)
+
+    if backend == 'memory':
+        store = MemoryBackend(max_entries=max_entries, max_bytes=max_bytes, max_age=max_age)
+    elif backend == 'sqlite':
+        store = SQLiteBackend(sqlite_path or 'cache.sqlite3', name, max_entries=max_entries,
+                              max_bytes=max_bytes, max_age=max_age)
+    elif backend == 'redis':
+        store = RedisBackend(redis_url, name, max_age=max_age)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+
+    cache = Cache(name, store, ttl=ttl, stale_ttl=stale_ttl)
+    with _registry_lock:
+        _registry[name] = cache
+    logging.info(f"Cache '{name}' using {backend} backend (ttl: {ttl}s)")
+    return cache
+
+def get_cache_stats():
+    """Return hit/miss counters for every registered cache."""
+    with _registry_lock:
+        caches = dict(_registry)
+    return {name: cache.get_stats() for name, cache in caches.items()}
@@ -0,0 +1,208 @@
+import re
+import logging
+import threading
+from urllib.parse import urlparse
+
+# Tokenizers by model, loaded on first use; None when tiktoken or its encoding file is unavailable
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def _get_encoding(model):
+    """tiktoken encoding for a model, or None to fall back to the character heuristic."""
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        try:
+            import tiktoken
+        except ImportError:
+            logging.warning("tiktoken is not installed, estimating token counts from text length")
+            encoding = None
+        else:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model or 'gpt-4o')
+                except KeyError:
+                    encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception as e:
+                # The encoding file is downloaded on first use unless it is in TIKTOKEN_CACHE_DIR
+                logging.warning(f"Could not load the tiktoken encoding for {model or 'gpt-4o'}, "
+                                f"estimating token counts from text length: {str(e)}")
+                encoding = None
+        _encodings[model] = encoding
+        return encoding
+
+def count_tokens(text, model=None):
+    """
+    Number of tokens in text for the given model
+
+    Uses tiktoken when it and its encoding are available, otherwise about four
+    characters per token.
+
+    Args:
+        text (str): Text to measure
+        model (str): OpenAI model name
+
+    Returns:
+        int: Token count
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """
+    Cut text to at most max_tokens, ending on a sentence or word boundary
+
+    Args:
+        text (str): Text to cut
+        max_tokens (int): Token limit
+        model (str): OpenAI model name
+
+    Returns:
+        str: The text, unchanged if it already fits
+    """
+    if max_tokens <= 0 or not text:
+        return ''
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = _get_encoding(model)
+    if encoding is None:
+        cut = text[:max_tokens * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    # End on a sentence if that loses little, otherwise at least on a whole word
+    sentence_end = max(cut.rfind('. '), cut.rfind('! '), cut.rfind('? '), cut.rfind('\n'))
+    if sentence_end > len(cut) * 0.8:
+        return cut[:sentence_end + 1].rstrip()
+    word_end = max(cut.rfind(' '), cut.rfind('\n'))
+    if word_end > 0:
+        return cut[:word_end].rstrip()
+    return cut
+
+def clean_text(text):
+    """
+    Collapse whitespace and drop repeated lines
+
+    Scraped pages repeat navigation, footers and cookie notices; every line
+    after its first occurrence is dropped.
+    """
+    seen = set()
+    lines = []
+    for line in (text or '').splitlines():
+        line = ' '.join(line.split())
+        key = line.lower()
+        if not line or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return '\n'.join(lines)
+
+def _words(text):
+    return set(re.findall(r'[a-z0-9]{3,}', (text or '').lower()))
+
+def rank_search_results(results, keywords=None):
+    """
+    Order search results by their value as prompt context
+
+    Results score higher for a better search position, for a snippet that
+    mentions the keywords, and for adding words not already covered by
+    higher-ranked results, so near-duplicate snippets sink to the bottom.
+
+    Args:
+        results (list): Result dicts with title, link, snippet and position
+        keywords (list): The searched keywords
+
+    Returns:
+        list: The results, best first
+    """
+    keyword_words = set()
+    for keyword in keywords or []:
+        keyword_words |= _words(keyword)
+
+    words = {id(result): _words(f"{result.get('title', '')} {result.get('snippet', '')}")
+             for result in results}
+    covered = set()
+
+    def score(result):
+        result_words = words[id(result)]
+        novelty = len(result_words - covered) / (len(result_words) or 1)
+        relevance = len(result_words & keyword_words) / (len(keyword_words) or 1)
+        position = 1 / (result.get('position') or 10)
+        return novelty + relevance + position
+
+    remaining = list(results)
+    ranked = []
+    while remaining:
+        best = max(remaining, key=score)
+        remaining.remove(best)
+        ranked.append(best)
+        covered |= words[id(best)]
+    return ranked
+
+def format_search_result(result, include_snippet=True):
+    """One search result as a compact line: title, domain and snippet."""
+    domain = (urlparse(result.get('link', '')).hostname or '').removeprefix('www.')
+    line = f"- {' '.join(result.get('title', '').split())} ({domain})"
+    snippet = ' '.join((result.get('snippet') or '').split())
+    if include_snippet and snippet:
+        line += f": {snippet}"
+    return line
+
+def pack_search_results(results, max_tokens, keywords=None, model=None):
+    """
+    Serialize the most useful search results into at most max_tokens
+
+    Results are ranked with rank_search_results() and written one per line.
+    When they don't all fit, the lowest-ranked results keep only their title
+    and domain, and if that is still too long they are dropped.
+
+    Returns:
+        str: The packed results
+    """
+    ranked = rank_search_results(results, keywords)
+    full = [format_search_result(result) for result in ranked]
+    short = [format_search_result(result, include_snippet=False) for result in ranked]
+
+    lines = []
+    used = 0
+    for i in range(len(ranked)):
+        for line in (full[i], short[i]):
+            cost = count_tokens(line, model) + 1
+            if used + cost <= max_tokens:
+                lines.append(line)
+                used += cost
+                break
+        else:
+            break
+    return '\n'.join(lines)
+
+def fit_sections(sections, max_tokens, model=None):
+    """
+    Cut several texts to share one token budget
+
+    Sections shorter than an even share keep their full length and pass the
+    rest of their share on; only the longest sections are truncated.
+
+    Args:
+        sections (list): Texts, in prompt order
+        max_tokens (int): Budget for all of them together
+
+    Returns:
+        list: The texts, each cut to its share
+    """
+    sizes = [count_tokens(section, model) for section in sections]
+    shares = [0] * len(sections)
+    remaining = max_tokens
+    pending = sorted(range(len(sections)), key=lambda i: sizes[i])
+    while pending:
+        share = remaining // len(pending)
+        i = pending.pop(0)
+        shares[i] = min(sizes[i], share)
+        remaining -= shares[i]
+    return [section if sizes[i] <= shares[i] else truncate_to_tokens(section, shares[i], model)
+            for i, section in enumerate(sections)]
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class JobExecutor:
+    """
+    Runs workflow functions outside of the request that triggered them.
+
+    Supported backends (selected with the JOB_EXECUTOR setting):
+        inline - run in the calling thread (useful for debugging)
+        thread - run on an in-process thread pool of JOB_WORKER_CONCURRENCY workers
+        asyncio - run the async workflow variants on one event loop thread, up to
+                  JOB_ASYNC_CONCURRENCY jobs at a time (at most the size of the
+                  database connection pool)
+        celery - enqueue on Celery/Redis; run with `celery -A worker.celery worker`
+
+    With JOB_ASYNC_WORKFLOW set, Celery tasks also run the async variants on a
+    shared per-process event loop, so a threads-pool worker process can have
+    dozens of jobs in flight.
+    """
+
+    BACKENDS = ('inline', 'thread', 'asyncio', 'celery')
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = 'thread'
+        self.concurrency = 4
+        self.async_concurrency = 15
+        self.async_workflow = False
+        self.celery = None
+        self._tasks = {}
+        self._async_tasks = {}
+        self._celery_tasks = {}
+        self._pool = None
+        self._loop = None
+        self._loop_thread = None
+        self._async_slots = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Configure the executor from the app config."""
+        self.app = app
+        self.backend = (app.config.get('JOB_EXECUTOR') or 'thread').lower()
+        self.concurrency = int(app.config.get('JOB_WORKER_CONCURRENCY') or 4)
+        self.async_concurrency = int(app.config.get('JOB_ASYNC_CONCURRENCY') or 15)
+        self.async_workflow = bool(app.config.get('JOB_ASYNC_WORKFLOW'))
+
+        # A pool checkout that has to wait blocks the whole event loop, so never
+        # run more async jobs than there are connections
+        engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        if 'pool_size' in engine_options:
+            connections = engine_options['pool_size'] + engine_options.get('max_overflow', 0)
+            if self.async_concurrency > connections:
+                logging.warning(f"JOB_ASYNC_CONCURRENCY {self.async_concurrency} exceeds the database pool "
+                                f"({connections} connections), using {connections}")
+                self.async_concurrency = connections
+
+        if self.backend not in self.BACKENDS:
+            logging.warning(f"Unknown JOB_EXECUTOR '{self.backend}', falling back to 'thread'")
+            self.backend = 'thread'
+
+        if self.backend == 'celery':
+            self.celery = self._make_celery(app)
+
+        app.extensions['job_executor'] = self
+        logging.info(f"Job executor: {self.backend} (concurrency: {self.concurrency})")
+
+    def _make_celery(self, app):
+        """Create a Celery app bound to the Flask app config."""
+        from celery import Celery
+
+        celery = Celery(
+            app.import_name,
+            broker=app.config.get('CELERY_BROKER_URL'),
+            backend=app.config.get('CELERY_RESULT_BACKEND')
+        )
+        celery.conf.update(
+            worker_concurrency=self.concurrency,
+            task_acks_late=True,
+            worker_prefetch_multiplier=1,
+            task_ignore_result=True
+        )
+        return celery
+
+    def register(self, name, func, async_func=None):
+        """
+        Register a workflow function that can be submitted by name
+
+        Args:
+            name (str): Task name
+            func (callable): Function taking the job ID as its only argument
+            async_func (callable): Optional coroutine function doing the same work,
+                used by the asyncio backend and by Celery when JOB_ASYNC_WORKFLOW is set
+        """
+        self._tasks[name] = func
+        if async_func is not None:
+            self._async_tasks[name] = async_func
+
+        if self.celery is not None:
+            app = self.app
+            executor = self
+
+            def run_task(job_id):
+                if executor.async_workflow and name in executor._async_tasks:
+                    executor.run_async(name, job_id)
+                    return
+                with app.app_context():
+                    func(job_id)
+
+            self._celery_tasks[name] = self.celery.task(name=f"contentplan.{name}")(run_task)
+
+        return func
+
+    def submit(self, name, job_id):
+        """
+        Submit a registered workflow function for a job
+
+        Args:
+            name (str): Task name passed to register()
+            job_id (str): The job to run it for
+        """
+        if name not in self._tasks:
+            raise KeyError(f"No task registered with name '{name}'")
+
+        if self.backend == 'celery':
+            self._celery_tasks[name].delay(job_id)
+        elif self.backend == 'asyncio':
+            self._submit_async(name, job_id)
+        elif self.backend == 'thread':
+            self._get_pool().submit(self._run, name, job_id)
+        else:
+            self._run(name, job_id)
+
+    def run_async(self, name, job_id):
+        """
+        Run a task on the shared event loop and block until it finishes
+
+        This is the entry point for worker processes: each calling thread waits
+        while the job itself only occupies a coroutine on the loop.
+
+        Args:
+            name (str): Task name passed to register()
+            job_id (str): The job to run it for
+        """
+        self._submit_async(name, job_id).result()
+
+    def _submit_async(self, name, job_id):
+        return asyncio.run_coroutine_threadsafe(self._run_async(name, job_id), self._get_loop())
+
+    def _get_loop(self):
+        """Start the event loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._async_slots = None
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='job-event-loop',
+                    daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    async def _run_async(self, name, job_id):
+        """Run a task's async variant inside an application context, bounded by JOB_ASYNC_CONCURRENCY."""
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.async_concurrency)
+
+        async with self._async_slots:
+            async_func = self._async_tasks.get(name)
+            if async_func is None:
+                # No async variant; keep the blocking function off the loop
+                await asyncio.to_thread(self._run, name, job_id)
+                return
+            try:
+                with self.app.app_context():
+                    await async_func(job_id)
+            except Exception as e:
+                logging.error(f"Unhandled error in task {name} for job {job_id}: {str(e)}")
+                import traceback
+                logging.error(traceback.format_exc())
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.concurrency,
+                    thread_name_prefix='job-worker'
+                )
+            return self._pool
+
+    def _run(self, name, job_id):
+        """Run a task inside an application context."""
+        try:
+            with self.app.app_context():
+                self._tasks[name](job_id)
+        except Exception as e:
+            logging.error(f"Unhandled error in task {name} for job {job_id}: {str(e)}")
+            import traceback
+            logging.error(traceback.format_exc())
+
+    def shutdown(self, wait=True):
+        """Stop the in-process worker pool and event loop."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+            loop, thread = self._loop, self._loop_thread
+            self._loop = None
+            self._loop_thread = None
+
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            if wait:
+                thread.join()
+                loop.close()
@@ -0,0 +1,291 @@
+import re
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urlparse, urljoin, urldefrag
+
+# Elements that never hold main content
+BOILERPLATE_TAGS = ["script", "style", "nav", "footer", "header", "aside", "iframe"]
+
+# Main content containers, in order of preference
+CONTENT_SELECTORS = ['article', 'main', '.content', '#content', '.main', '#main']
+
+# Links to these file types are never crawled
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip',
+                      '.mp3', '.mp4', '.avi', '.mov', '.doc', '.docx', '.xls', '.xlsx', '.css', '.js')
+
+# Elements without an end tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+
+def sniff_encoding(head, default='utf-8'):
+    """Find the charset declared in the first bytes of an HTML document."""
+    match = re.search(rb'charset=["\']?([\w-]+)', head[:2048], re.IGNORECASE)
+    return match.group(1).decode('ascii') if match else default
+
+def decode_html(html):
+    """Decode HTML bytes using the declared charset, replacing invalid sequences."""
+    if isinstance(html, str):
+        return html
+    try:
+        return html.decode(sniff_encoding(html), errors='replace')
+    except LookupError:
+        return html.decode('utf-8', errors='replace')
+
+def normalize_link(base_url, href):
+    """Resolve a link against its page and drop fragments; None if not crawlable."""
+    if not href or href.startswith(('mailto:', 'tel:', 'javascript:')):
+        return None
+    url, _ = urldefrag(urljoin(base_url, href))
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return None
+    if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    return url
+
+def _matching_selectors(tag, attrs):
+    """Return the CONTENT_SELECTORS an element matches."""
+    classes = (attrs.get('class') or '').split()
+    element_id = attrs.get('id')
+    matches = []
+    for selector in CONTENT_SELECTORS:
+        if selector.startswith('.'):
+            if selector[1:] in classes:
+                matches.append(selector)
+        elif selector.startswith('#'):
+            if element_id == selector[1:]:
+                matches.append(selector)
+        elif tag == selector:
+            matches.append(selector)
+    return matches
+
+def _choose_text(container_blocks, body_blocks, all_blocks):
+    """Apply the container preference order, falling back to body then the whole document."""
+    for selector in CONTENT_SELECTORS:
+        if selector in container_blocks:
+            if container_blocks[selector]:
+                return '\n'.join(container_blocks[selector])
+            break
+    return '\n'.join(body_blocks) or '\n'.join(all_blocks)
+
+def extract_main_text_bs4(soup, separator=' '):
+    """Strip boilerplate elements from a BeautifulSoup tree and return the main content text."""
+    # Remove script, style, nav, footer, header elements
+    for element in soup(BOILERPLATE_TAGS):
+        element.extract()
+
+    # Get the main content - prefer articles or main elements if they exist
+    main_content = None
+
+    # Try to find main content containers
+    for selector in CONTENT_SELECTORS:
+        elements = soup.select(selector)
+        if elements:
+            main_content = separator.join([elem.get_text(separator=separator, strip=True) for elem in elements])
+            break
+
+    # If no specific content container found, use the body
+    if not main_content:
+        main_content = soup.body.get_text(separator=separator, strip=True) if soup.body else ''
+
+    # If still empty, use the entire document
+    if not main_content:
+        main_content = soup.get_text(separator=separator, strip=True)
+
+    return main_content
+
+def extract_bs4(html, url):
+    """Reference extractor: BeautifulSoup with html.parser, several tree walks."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [normalize_link(url, a.get('href')) for a in soup.find_all('a', href=True)]
+    return {
+        'text': extract_main_text_bs4(soup, separator='\n'),
+        'links': [link for link in links if link]
+    }
+
+# XML declaration at the start of XHTML pages
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def extract_lxml(html, url):
+    """lxml extractor: C parser, then a single walk to find links, boilerplate and containers."""
+    import lxml.html
+
+    # lxml refuses already-decoded strings that still declare an encoding
+    if isinstance(html, str):
+        html = XML_DECLARATION.sub('', html, count=1)
+    root = lxml.html.document_fromstring(html)
+    boilerplate = set(BOILERPLATE_TAGS)
+    links = []
+    doomed = []
+    containers = {}
+
+    # Pre-order walk that does not descend into boilerplate elements or comments
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        tag = element.tag if isinstance(element.tag, str) else None
+        if tag is None or tag in boilerplate:
+            doomed.append(element)
+            # Navigation links still matter for crawling
+            if tag is not None:
+                for anchor in element.iter('a'):
+                    link = normalize_link(url, anchor.get('href'))
+                    if link:
+                        links.append(link)
+            continue
+        if tag == 'a' and element.get('href'):
+            link = normalize_link(url, element.get('href'))
+            if link:
+                links.append(link)
+        for selector in _matching_selectors(tag, element.attrib):
+            containers.setdefault(selector, []).append(element)
+        stack.extend(reversed(element))
+
+    for element in doomed:
+        # drop_tree() keeps the tail text, which belongs to the parent
+        element.drop_tree()
+
+    def blocks(element):
+        return [text.strip() for text in element.itertext() if text.strip()]
+
+    container_blocks = {
+        selector: [block for element in elements for block in blocks(element)]
+        for selector, elements in containers.items()
+    }
+
+    body = root.find('body')
+    body_blocks = blocks(body) if body is not None else []
+
+    return {
+        'text': _choose_text(container_blocks, body_blocks, blocks(root)),
+        'links': links
+    }
+
+class StreamingExtractor(HTMLParser):
+    """
+    Single-pass, SAX-style text extractor built on the standard library parser
+
+    Feed it HTML incrementally with feed(); text inside boilerplate elements is
+    skipped as it streams past, and text inside content containers is collected
+    per selector, so no tree is ever built.
+    """
+
+    def __init__(self, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.links = []
+        self.container_blocks = {}
+        self.body_blocks = []
+        self.all_blocks = []
+        self._stack = []
+        self._skip_depth = 0
+        self._body_depth = 0
+        self._open_selectors = {}
+        self._chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a' and attrs.get('href'):
+            link = normalize_link(self.url, attrs['href'])
+            if link:
+                self.links.append(link)
+
+        if tag in VOID_TAGS:
+            return
+
+        skip = tag in BOILERPLATE_TAGS
+        selectors = [] if self._skip_depth or skip else _matching_selectors(tag, attrs)
+        self._stack.append((tag, skip, selectors))
+
+        if skip:
+            self._skip_depth += 1
+        if tag == 'body':
+            self._body_depth += 1
+        for selector in selectors:
+            self.container_blocks.setdefault(selector, [])
+            self._open_selectors[selector] = self._open_selectors.get(selector, 0) + 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags never contain text
+        if tag == 'a':
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Close the nearest matching element, along with anything left unclosed inside it
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > index:
+            closed, skip, selectors = self._stack.pop()
+            if skip:
+                self._skip_depth -= 1
+            if closed == 'body':
+                self._body_depth -= 1
+            for selector in selectors:
+                self._open_selectors[selector] -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = data.strip()
+        if not text:
+            return
+
+        self.all_blocks.append(text)
+        self._chars += len(text) + 1
+        if self._body_depth:
+            self.body_blocks.append(text)
+        for selector, depth in self._open_selectors.items():
+            if depth > 0:
+                self.container_blocks[selector].append(text)
+
+    def main_text_length(self):
+        """Length of the main content text extracted so far."""
+        for selector in CONTENT_SELECTORS:
+            if selector in self.container_blocks:
+                return sum(len(block) + 1 for block in self.container_blocks[selector])
+        return self._chars
+
+    def result(self):
+        return {
+            'text': _choose_text(self.container_blocks, self.body_blocks, self.all_blocks),
+            'links': self.links
+        }
+
+def extract_stream(html, url):
+    """Streaming extractor: one pass over the markup with the standard library parser."""
+    extractor = StreamingExtractor(url)
+    extractor.feed(decode_html(html))
+    extractor.close()
+    return extractor.result()
+
+EXTRACTORS = {
+    'bs4': extract_bs4,
+    'lxml': extract_lxml,
+    'stream': extract_stream
+}
+
+def get_extractor(name):
+    """
+    Look up an extraction backend by name
+
+    Falls back to the bs4 extractor if the backend is unknown or its
+    optional dependency (lxml) is not installed.
+    """
+    name = (name or 'bs4').lower()
+    if name not in EXTRACTORS:
+        logging.warning(f"Unknown SCRAPE_EXTRACTOR '{name}', using bs4")
+        return extract_bs4
+    if name == 'lxml':
+        try:
+            import lxml.html  # noqa: F401
+        except ImportError:
+            logging.warning("lxml is not installed, using the bs4 extractor")
+            return extract_bs4
+    return EXTRACTORS[name]
@@ -0,0 +1,300 @@
+import os
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared session settings, set up by configure_http()
+_settings = {
+    'pool_connections': 10,
+    'pool_maxsize': 20,
+    'max_retries': 3,
+    'backoff_factor': 0.5,
+    'per_host_concurrency': 8
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+_host_limits = {}
+_host_stats = {}
+_stats_lock = threading.Lock()
+
+# Async clients and per-host semaphores, one set per event loop
+_async_clients = weakref.WeakKeyDictionary()
+_async_host_limits = weakref.WeakKeyDictionary()
+
+# Responses retried by both the sync and the async client
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class _CountingRetry(Retry):
+    """Retry policy that records each retry in the per-host stats."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if _pool is not None:
+            _record(_pool.host, 'retries')
+        return super().increment(method=method, url=url, response=response, error=error,
+                                 _pool=_pool, _stacktrace=_stacktrace)
+
+def configure_http(config):
+    """
+    Set up the shared HTTP session from app config
+
+    Args:
+        config (dict): Flask app config
+    """
+    global _session
+    _settings.update({
+        'pool_connections': config.get('HTTP_POOL_CONNECTIONS', _settings['pool_connections']),
+        'pool_maxsize': config.get('HTTP_POOL_MAXSIZE', _settings['pool_maxsize']),
+        'max_retries': config.get('HTTP_MAX_RETRIES', _settings['max_retries']),
+        'backoff_factor': config.get('HTTP_BACKOFF_FACTOR', _settings['backoff_factor']),
+        'per_host_concurrency': config.get('HTTP_PER_HOST_CONCURRENCY', _settings['per_host_concurrency'])
+    })
+    with _session_lock:
+        _session = None
+    with _stats_lock:
+        _host_limits.clear()
+    _async_host_limits.clear()
+
+def get_session():
+    """
+    Return the process-wide requests session
+
+    The session keeps a keep-alive connection pool per host and retries
+    429/5xx responses and connection errors with exponential backoff,
+    honouring Retry-After.
+    """
+    global _session
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is None:
+            retry = _CountingRetry(
+                total=_settings['max_retries'],
+                backoff_factor=_settings['backoff_factor'],
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=_settings['pool_connections'],
+                pool_maxsize=_settings['pool_maxsize'],
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+def _record(host, counter, amount=1):
+    with _stats_lock:
+        stats = _host_stats.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'in_flight': 0})
+        stats[counter] += amount
+
+def _host_limit(host):
+    with _stats_lock:
+        limit = _host_limits.get(host)
+        if limit is None:
+            limit = threading.BoundedSemaphore(_settings['per_host_concurrency'])
+            _host_limits[host] = limit
+        return limit
+
+def http_get(url, **kwargs):
+    """
+    GET a URL through the shared session, limiting concurrent requests per host
+
+    Accepts the same keyword arguments as requests.get. For stream=True the
+    host slot is held until the response is closed, so use it as a context
+    manager or close it when done.
+
+    Returns:
+        requests.Response: The response
+    """
+    host = urlparse(url).hostname or url
+    limit = _host_limit(host)
+    limit.acquire()
+    _record(host, 'requests')
+    _record(host, 'in_flight')
+
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            _record(host, 'in_flight', -1)
+            limit.release()
+
+    try:
+        response = get_session().get(url, **kwargs)
+    except Exception:
+        _record(host, 'errors')
+        release()
+        raise
+
+    if kwargs.get('stream'):
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+
+        response.close = close_and_release
+    else:
+        release()
+
+    return response
+
+def get_async_client():
+    """
+    Return the httpx.AsyncClient for the running event loop
+
+    Async clients are bound to the loop they were created on, so each loop
+    gets its own keep-alive pool, sized like the sync session's. Connection
+    errors are retried by the transport; retryable statuses are retried by
+    http_get_async() and http_stream_async().
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        transport = httpx.AsyncHTTPTransport(
+            retries=_settings['max_retries'],
+            limits=httpx.Limits(
+                max_connections=_settings['pool_connections'] * _settings['pool_maxsize'],
+                max_keepalive_connections=_settings['pool_maxsize']
+            )
+        )
+        client = httpx.AsyncClient(transport=transport, follow_redirects=True)
+        _async_clients[loop] = client
+    return client
+
+def _async_host_limit(host):
+    limits = _async_host_limits.setdefault(asyncio.get_running_loop(), {})
+    limit = limits.get(host)
+    if limit is None:
+        limit = asyncio.Semaphore(_settings['per_host_concurrency'])
+        limits[host] = limit
+    return limit
+
+def _retry_delay(response, attempt):
+    """Seconds to wait before retrying, honouring a numeric Retry-After header."""
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return float(retry_after)
+    return _settings['backoff_factor'] * (2 ** attempt)
+
+async def _send_async(client, url, stream, kwargs):
+    """Send a GET, retrying retryable statuses with exponential backoff."""
+    host = urlparse(url).hostname or url
+    attempt = 0
+    while True:
+        request = client.build_request('GET', url, **kwargs)
+        response = await client.send(request, stream=stream)
+        if response.status_code not in RETRY_STATUSES or attempt >= _settings['max_retries']:
+            return response
+        await response.aclose()
+        _record(host, 'retries')
+        await asyncio.sleep(_retry_delay(response, attempt))
+        attempt += 1
+
+async def http_get_async(url, **kwargs):
+    """
+    Async counterpart of http_get(), limiting concurrent requests per host
+
+    Accepts the keyword arguments of httpx.AsyncClient.build_request
+    (params, headers, timeout, ...).
+
+    Returns:
+        httpx.Response: The response, with its body read
+    """
+    host = urlparse(url).hostname or url
+    async with _async_host_limit(host):
+        _record(host, 'requests')
+        _record(host, 'in_flight')
+        try:
+            return await _send_async(get_async_client(), url, False, kwargs)
+        except Exception:
+            _record(host, 'errors')
+            raise
+        finally:
+            _record(host, 'in_flight', -1)
+
+@asynccontextmanager
+async def http_stream_async(url, **kwargs):
+    """
+    Stream a GET response, holding the host slot until the block exits
+
+    Usage:
+        async with http_stream_async(url, headers=...) as response:
+            async for chunk in response.aiter_bytes():
+                ...
+    """
+    host = urlparse(url).hostname or url
+    async with _async_host_limit(host):
+        _record(host, 'requests')
+        _record(host, 'in_flight')
+        try:
+            response = await _send_async(get_async_client(), url, True, kwargs)
+        except Exception:
+            _record(host, 'errors')
+            _record(host, 'in_flight', -1)
+            raise
+        try:
+            yield response
+        finally:
+            await response.aclose()
+            _record(host, 'in_flight', -1)
+
+async def close_async_client():
+    """Close the running loop's async client and its connections."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def get_http_stats():
+    """Return per-host request counters and connection pool usage."""
+    with _stats_lock:
+        hosts = {host: dict(stats) for host, stats in _host_stats.items()}
+
+    pools = []
+    session = _session
+    if session is not None:
+        adapter = session.get_adapter('https://')
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': pool.host,
+                'port': pool.port,
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': sum(1 for conn in pool.pool.queue if conn is not None) if pool.pool else 0
+            })
+
+    return {'hosts': hosts, 'pools': pools, 'settings': dict(_settings)}
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared with the parent process
+    global _session, _session_lock, _stats_lock
+    _session = None
+    _session_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _host_limits.clear()
+    _host_stats.clear()
+    _async_clients.clear()
+    _async_host_limits.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
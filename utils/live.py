@@ -0,0 +1,205 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+class MemoryChannel:
+    """
+    In-process, per-job event log with blocking reads
+
+    Works with the 'inline' and 'thread' job executors, where the workflow
+    runs in the same process as the web server.
+    """
+
+    def __init__(self, max_jobs=500):
+        self.max_jobs = max_jobs
+        self._events = OrderedDict()
+        self._cond = threading.Condition()
+
+    def publish(self, job_id, event):
+        """
+        Append an event to a job's log
+
+        Args:
+            job_id (str): The job ID
+            event (dict): JSON-serializable event payload
+
+        Returns:
+            int: The event's sequence number
+        """
+        with self._cond:
+            events = self._events.setdefault(job_id, [])
+            self._events.move_to_end(job_id)
+            event = dict(event, seq=len(events) + 1)
+            events.append(event)
+
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+
+            self._cond.notify_all()
+            return event['seq']
+
+    def read(self, job_id, cursor=0, timeout=0):
+        """
+        Return events after the cursor, waiting up to `timeout` seconds for new ones
+
+        Args:
+            job_id (str): The job ID
+            cursor (int): Sequence number of the last event already seen
+            timeout (float): Seconds to wait when there is nothing new
+
+        Returns:
+            list: Events with seq greater than cursor
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events = self._events.get(job_id, [])
+                if len(events) > cursor:
+                    return events[cursor:]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+class RedisChannel:
+    """
+    Per-job event log in Redis, shared between web and worker processes
+
+    Events are kept in a list per job and announced on a pub/sub channel so
+    readers wake up as soon as something is published.
+    """
+
+    def __init__(self, redis_url, expire=86400):
+        import redis
+
+        self.expire = expire
+        self._client = redis.Redis.from_url(redis_url)
+
+    def _key(self, job_id):
+        return f"contentplan:job:{job_id}:events"
+
+    def _topic(self, job_id):
+        return f"contentplan:job:{job_id}"
+
+    def publish(self, job_id, event):
+        key = self._key(job_id)
+        # The list length after RPUSH is the event's sequence number, but the
+        # payload has to carry it too, so reserve the slot first.
+        seq = self._client.rpush(key, '')
+        event = dict(event, seq=seq)
+        pipe = self._client.pipeline()
+        pipe.lset(key, seq - 1, json.dumps(event))
+        pipe.expire(key, self.expire)
+        pipe.publish(self._topic(job_id), seq)
+        pipe.execute()
+        return seq
+
+    def read(self, job_id, cursor=0, timeout=0):
+        events = self._fetch(job_id, cursor)
+        if events or timeout <= 0:
+            return events
+
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self._topic(job_id))
+            # Re-check after subscribing so nothing published in between is missed
+            events = self._fetch(job_id, cursor)
+            deadline = time.monotonic() + timeout
+            while not events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if pubsub.get_message(timeout=remaining):
+                    events = self._fetch(job_id, cursor)
+            return events
+        finally:
+            pubsub.close()
+
+    def _fetch(self, job_id, cursor):
+        raw = self._client.lrange(self._key(job_id), cursor, -1)
+        # Skip slots reserved by a publish that has not filled them in yet
+        events = []
+        for item in raw:
+            if not item:
+                break
+            events.append(json.loads(item))
+        return events
+
+def create_channel(config):
+    """
+    Create the live event channel from app config
+
+    Args:
+        config (dict): Flask app config
+
+    Returns:
+        MemoryChannel or RedisChannel
+    """
+    backend = (config.get('LIVE_CHANNEL_BACKEND') or 'memory').lower()
+    if backend == 'redis':
+        return RedisChannel(config.get('REDIS_URL'))
+    if backend != 'memory':
+        logging.warning(f"Unknown LIVE_CHANNEL_BACKEND '{backend}', using in-process channel")
+    return MemoryChannel()
+
+class PartialOutputWriter:
+    """
+    Buffers streamed LLM tokens for one workflow phase and publishes them in batches
+
+    Call the writer with each text delta, then close() it to flush the rest.
+    When a phase runs several agent calls at once, give each its own `part`
+    (and a display `label`) so their outputs are shown separately. reset()
+    clears what has been shown so far, e.g. before retrying a failed call.
+    """
+
+    def __init__(self, channel, job_id, phase, flush_interval=0.25, flush_chars=200,
+                 part=None, label=None):
+        self.channel = channel
+        self.job_id = job_id
+        self.phase = phase
+        self.part = part
+        self.label = label
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def __call__(self, delta):
+        if not delta:
+            return
+        self._buffer.append(delta)
+        self._buffered += len(delta)
+        if (self._buffered >= self.flush_chars
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        text = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._publish({'type': 'partial', 'phase': self.phase, 'text': text})
+
+    def reset(self):
+        """Drop buffered text and clear the output published for this phase (or part) so far."""
+        self._buffer = []
+        self._buffered = 0
+        self._publish({'type': 'reset', 'phase': self.phase})
+
+    def _publish(self, event):
+        try:
+            if self.part is not None:
+                event['part'] = self.part
+                event['label'] = self.label
+            self.channel.publish(self.job_id, event)
+        except Exception as e:
+            # Live output is best-effort; never fail the workflow over it
+            logging.warning(f"Could not publish partial output for job {self.job_id}: {str(e)}")
+
+    def close(self):
+        self.flush()
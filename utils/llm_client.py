@@ -0,0 +1,141 @@
+import os
+import asyncio
+import logging
+import threading
+import weakref
+
+# Process-wide OpenAI clients, keyed by API key and pool settings
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Async clients are bound to the event loop they were created on
+_async_clients = weakref.WeakKeyDictionary()
+
+def _pool_settings(config):
+    """Read connection pool settings from app config."""
+    return (
+        int(config.get('OPENAI_MAX_CONNECTIONS', 20)),
+        int(config.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10)),
+        float(config.get('OPENAI_KEEPALIVE_EXPIRY', 60)),
+        float(config.get('OPENAI_TIMEOUT', 120)),
+        float(config.get('OPENAI_CONNECT_TIMEOUT', 10)),
+        int(config.get('OPENAI_MAX_RETRIES', 2))
+    )
+
+def get_openai_client(api_key, config):
+    """
+    Return a shared OpenAI client with a keep-alive connection pool
+
+    Clients are created once per process and API key, then reused by every
+    call. The OpenAI client is thread-safe, so worker threads share one pool.
+
+    Args:
+        api_key (str): OpenAI API key
+        config (dict): Flask app config holding the pool settings
+
+    Returns:
+        OpenAI: The shared client
+    """
+    settings = _pool_settings(config)
+    key = (api_key, settings)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(api_key, *settings)
+            _clients[key] = client
+        return client
+
+def _build_client(api_key, max_connections, max_keepalive, keepalive_expiry,
+                  timeout, connect_timeout, max_retries):
+    import httpx
+    from openai import OpenAI
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+    logging.info(f"Created pooled OpenAI client (max connections: {max_connections})")
+    return OpenAI(api_key=api_key, http_client=http_client, max_retries=max_retries)
+
+def get_async_openai_client(api_key, config):
+    """
+    Return the AsyncOpenAI client for the running event loop
+
+    Like get_openai_client(), but the connection pool belongs to the current
+    event loop, so all coroutines on that loop share it.
+
+    Args:
+        api_key (str): OpenAI API key
+        config (dict): Flask app config holding the pool settings
+
+    Returns:
+        AsyncOpenAI: The shared client
+    """
+    settings = _pool_settings(config)
+    key = (api_key, settings)
+    loop = asyncio.get_running_loop()
+
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = _build_async_client(api_key, *settings)
+            clients[key] = client
+        return client
+
+def _build_async_client(api_key, max_connections, max_keepalive, keepalive_expiry,
+                        timeout, connect_timeout, max_retries):
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+    logging.info(f"Created pooled async OpenAI client (max connections: {max_connections})")
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=max_retries)
+
+async def close_async_clients():
+    """Close the running loop's async clients and their connections."""
+    with _clients_lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logging.warning(f"Error closing async OpenAI client: {str(e)}")
+
+def close_clients():
+    """Close all pooled clients and their connections."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logging.warning(f"Error closing OpenAI client: {str(e)}")
+
+def _reset_after_fork():
+    # Connections must not be shared with the parent process (e.g. Celery prefork
+    # or gunicorn preload), so forked children start with an empty pool.
+    global _clients_lock
+    _clients.clear()
+    _async_clients.clear()
+    _clients_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
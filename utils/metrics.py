@@ -0,0 +1,122 @@
+import time
+import threading
+from collections import deque
+
+# Latency samples kept per phase and model for percentiles
+SAMPLE_SIZE = 500
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+class PhaseMetrics:
+    """
+    Latency and token counts of agent calls, by workflow phase and model
+
+    Counts are per process, like the cache and HTTP stats.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def start(self, phase, model, on_delta=None, on_usage=None):
+        """Begin timing one call; see AgentCall."""
+        return AgentCall(self, phase, model, on_delta, on_usage)
+
+    def record(self, phase, model, seconds, first_token_seconds, usage, ok):
+        with self._lock:
+            stats = self._stats.setdefault((phase, model), {
+                'calls': 0,
+                'errors': 0,
+                'cache_hits': 0,
+                'prompt_tokens': 0,
+                'cached_tokens': 0,
+                'completion_tokens': 0,
+                'latency': deque(maxlen=self.sample_size),
+                'first_token': deque(maxlen=self.sample_size)
+            })
+            stats['calls'] += 1
+            if not ok:
+                stats['errors'] += 1
+            if usage is None:
+                if ok:
+                    # Answered without an API call (from the LLM response cache)
+                    stats['cache_hits'] += 1
+            else:
+                for name in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+                    stats[name] += usage.get(name, 0)
+                stats['latency'].append(seconds)
+                if first_token_seconds is not None:
+                    stats['first_token'].append(first_token_seconds)
+
+    def get_stats(self):
+        """
+        Summary per phase and model
+
+        Returns:
+            dict: phase -> model -> counts, token totals and per-call averages,
+                and p50/p95 latency and time to first token in seconds
+        """
+        with self._lock:
+            snapshot = {key: dict(stats, latency=list(stats['latency']),
+                                  first_token=list(stats['first_token']))
+                        for key, stats in self._stats.items()}
+
+        result = {}
+        for (phase, model), stats in sorted(snapshot.items()):
+            api_calls = len(stats['latency'])
+            latency = stats.pop('latency')
+            first_token = stats.pop('first_token')
+            stats.update({
+                'latency_p50': _percentile(latency, 0.5),
+                'latency_p95': _percentile(latency, 0.95),
+                'first_token_p50': _percentile(first_token, 0.5),
+                'first_token_p95': _percentile(first_token, 0.95),
+                'avg_prompt_tokens': round(stats['prompt_tokens'] / api_calls) if api_calls else 0,
+                'avg_completion_tokens': round(stats['completion_tokens'] / api_calls) if api_calls else 0
+            })
+            result.setdefault(phase, {})[model] = stats
+        return result
+
+class AgentCall:
+    """
+    Times one agent call for PhaseMetrics
+
+    Pass on_delta and on_usage to run_agent_with_openai(); they forward to the
+    caller's own callbacks. Call finish() with the outcome when it returns.
+    """
+
+    def __init__(self, metrics, phase, model, on_delta=None, on_usage=None):
+        self.metrics = metrics
+        self.phase = phase
+        self.model = model
+        self._on_delta = on_delta
+        self._on_usage = on_usage
+        self._started = time.monotonic()
+        self._first_token = None
+        self._usage = None
+
+    def on_delta(self, delta):
+        if self._first_token is None:
+            self._first_token = time.monotonic() - self._started
+        if self._on_delta is not None:
+            self._on_delta(delta)
+
+    def on_usage(self, usage):
+        self._usage = usage
+        if self._on_usage is not None:
+            self._on_usage(usage)
+
+    def finish(self, ok):
+        self.metrics.record(self.phase, self.model, time.monotonic() - self._started,
+                            self._first_token, self._usage, ok)
+
+# Process-wide metrics for the workflow's agent calls
+phase_metrics = PhaseMetrics()
+
+def get_phase_metrics():
+    return phase_metrics.get_stats()
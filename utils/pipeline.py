@@ -0,0 +1,74 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Stage:
+    """
+    A unit of work in a pipeline
+
+    Args:
+        name (str): Stage name, used to look up its result
+        func (callable): Called with the results of its dependencies as keyword arguments
+        deps (list): Names of stages that must finish first
+    """
+
+    def __init__(self, name, func, deps=None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps or [])
+
+def run_pipeline(stages, max_workers=None, context=None):
+    """
+    Run stages concurrently, starting each one as soon as its dependencies finish
+
+    Args:
+        stages (list): Stage objects
+        max_workers (int): Maximum stages running at once (defaults to the number of stages)
+        context (callable): Optional factory for a context manager entered around each
+            stage in its worker thread, e.g. `app.app_context`
+
+    Returns:
+        dict: Stage name -> result
+
+    Raises:
+        Exception: The first error raised by a stage; stages not yet started are skipped
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {', '.join(missing)}")
+
+    def call(stage, kwargs):
+        if context is None:
+            return stage.func(**kwargs)
+        with context():
+            return stage.func(**kwargs)
+
+    results = {}
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are done
+            for stage in [s for s in pending if all(dep in results for dep in s.deps)]:
+                pending.remove(stage)
+                kwargs = {dep: results[dep] for dep in stage.deps}
+                running[pool.submit(call, stage, kwargs)] = stage
+
+            if not running:
+                raise ValueError("Pipeline has a dependency cycle: "
+                                 + ', '.join(stage.name for stage in pending))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception:
+                    logging.error(f"Pipeline stage '{stage.name}' failed")
+                    for other in running:
+                        other.cancel()
+                    raise
+
+    return results
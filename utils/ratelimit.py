@@ -0,0 +1,52 @@
+import time
+import threading
+from urllib.parse import urlparse
+
+class HostRateLimiter:
+    """
+    Thread-safe limiter that spaces out requests to the same host
+
+    Each host gets at most `rate` requests per second. Callers block in
+    wait() until their slot comes up (async callers sleep for the delay
+    returned by reserve()); requests to different hosts do not wait on
+    each other.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url_or_host):
+        """
+        Claim the next request slot for a host without blocking
+
+        Args:
+            url_or_host (str): A full URL or a bare host name
+
+        Returns:
+            float: Seconds to wait before sending the request (0 if it may go now)
+        """
+        if not self.rate or self.rate <= 0:
+            return 0.0
+
+        host = urlparse(url_or_host).netloc or url_or_host
+        interval = 1.0 / self.rate
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+
+        return max(0.0, slot - now)
+
+    def wait(self, url_or_host):
+        """
+        Block until a request to the given host may be sent
+
+        Args:
+            url_or_host (str): A full URL or a bare host name
+        """
+        delay = self.reserve(url_or_host)
+        if delay > 0:
+            time.sleep(delay)
@@ -1,7 +1,42 @@
 import re
+import codecs
+import asyncio
+import hashlib
+import logging
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urljoin
+from urllib.robotparser import RobotFileParser
+from utils.ratelimit import HostRateLimiter
+from utils.http_session import http_get, http_stream_async
+from utils.cache import create_cache
+from utils.extract import get_extractor, normalize_link, sniff_encoding, extract_stream, StreamingExtractor
+
+# Set headers to mimic a browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Scraped page cache and HTML extraction backend, set up by configure_scraper()
+_page_cache = None
+_extractor = get_extractor('bs4')
+
+# Download limits, set up by configure_scraper()
+_max_bytes = 2 * 1024 * 1024
+_max_chars = 20000
+_early_stop_bytes = 512 * 1024
+
+# Most of robots.txt that is read, as in Google's crawler
+ROBOTS_MAX_BYTES = 500 * 1024
+
+class ScrapeError(Exception):
+    """Raised when a page cannot be fetched or is not usable HTML."""
 
 def validate_url(url):
     """Validate if the given string is a proper URL."""
@@ -11,72 +46,469 @@ def validate_url(url):
     except ValueError:
         return False
 
+def configure_scraper(config):
+    """
+    Set up the HTML extraction backend, download limits and scraped page cache from app config
+
+    Args:
+        config (dict): Flask app config
+    """
+    global _page_cache, _extractor, _max_bytes, _max_chars, _early_stop_bytes
+    _extractor = get_extractor(config.get('SCRAPE_EXTRACTOR', 'bs4'))
+    _max_bytes = config.get('SCRAPE_MAX_BYTES', _max_bytes)
+    _max_chars = config.get('MAX_WEBSITE_CONTENT_LENGTH', _max_chars)
+    _early_stop_bytes = config.get('SCRAPE_EARLY_STOP_BYTES', _early_stop_bytes)
+    _page_cache = create_cache(
+        'scrape',
+        backend=config.get('SCRAPE_CACHE_BACKEND', 'memory'),
+        ttl=config.get('SCRAPE_CACHE_TTL', 3600),
+        max_age=config.get('SCRAPE_CACHE_MAX_AGE', 604800),
+        max_entries=config.get('SCRAPE_CACHE_MAX_ENTRIES', 1000),
+        max_bytes=config.get('SCRAPE_CACHE_MAX_BYTES'),
+        sqlite_path=config.get('CACHE_SQLITE_PATH'),
+        redis_url=config.get('REDIS_URL')
+    )
+
+def _fetch_page(url, timeout=15, headers=None, need_links=False):
+    """
+    Stream a page and extract it as it downloads
+
+    Headers are checked before any of the body is read. The body is read in
+    chunks, decoded incrementally and capped at SCRAPE_MAX_BYTES. Unless
+    need_links is set, reading stops early: with the streaming extractor as
+    soon as enough main content text for MAX_WEBSITE_CONTENT_LENGTH has been
+    extracted, with the tree extractors at SCRAPE_EARLY_STOP_BYTES. Crawls
+    set need_links to read on for the links further down the page.
+
+    Returns:
+        tuple: (response, page), where page is None for a 304 Not Modified
+
+    Raises:
+        ScrapeError: If the response is not HTML
+        requests.exceptions.RequestException: If the request fails
+    """
+    # Make the request with a timeout, without downloading the body yet
+    with http_get(url, headers=headers or HEADERS, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            return response, None
+        response.raise_for_status()
+        _check_html(response)
+
+        declared = response.encoding if 'charset=' in response.headers.get('Content-Type', '').lower() else None
+        reader = _PageReader(url, declared, stop_early=not need_links)
+        for chunk in response.iter_content(chunk_size=16384):
+            if reader.feed(chunk):
+                break
+        return response, reader.result()
+
+async def _fetch_page_async(url, timeout=15, headers=None, need_links=False):
+    """
+    Async version of _fetch_page(), streaming through the shared httpx client
+
+    Raises:
+        ScrapeError: If the response is not HTML
+        httpx.HTTPError: If the request fails
+    """
+    async with http_stream_async(url, headers=headers or HEADERS, timeout=timeout) as response:
+        if response.status_code == 304:
+            return response, None
+        response.raise_for_status()
+        _check_html(response)
+
+        reader = _PageReader(url, response.charset_encoding, stop_early=not need_links)
+        async for chunk in response.aiter_bytes(16384):
+            if reader.feed(chunk):
+                break
+        if reader.streaming:
+            return response, reader.result()
+        # Tree-building extractors parse the whole page at once; keep that off the event loop
+        return response, await asyncio.to_thread(reader.result)
+
+def _check_html(response):
+    content_type = response.headers.get('Content-Type', '').lower()
+    if 'text/html' not in content_type:
+        raise ScrapeError(f"Not an HTML page (Content-Type: {content_type})")
+
+class _PageReader:
+    """
+    Decodes a streamed page body incrementally and extracts it, up to the byte cap
+
+    Call feed() with each chunk until it returns True (enough has been read)
+    or the body ends, then result(). With stop_early, the streaming extractor
+    stops once it has enough main text and the tree extractors once
+    SCRAPE_EARLY_STOP_BYTES have been read; the page is then marked
+    'partial_links' since links further down were never seen.
+    """
+
+    def __init__(self, url, declared_encoding=None, stop_early=True):
+        self.url = url
+        self.declared_encoding = declared_encoding
+        self.stop_early = stop_early
+        self.received = 0
+        self._extractor = StreamingExtractor(url) if _extractor is extract_stream else None
+        self._parts = []
+        self._decoder = None
+        self._stopped = False
+        self._partial_links = False
+
+    @property
+    def streaming(self):
+        """True when the page is extracted as it is read rather than in result()."""
+        return self._extractor is not None
+
+    def feed(self, chunk):
+        """Consume a chunk of the body; returns True once reading can stop."""
+        if self._decoder is None:
+            encoding = self.declared_encoding or sniff_encoding(chunk)
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+            except LookupError:
+                self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        self.received += len(chunk)
+        text = self._decoder.decode(chunk)
+
+        if self._extractor is not None:
+            self._extractor.feed(text)
+            if self.stop_early and self._extractor.main_text_length() >= _max_chars:
+                self._stopped = True
+                self._partial_links = True
+                return True
+        else:
+            self._parts.append(text)
+            # Tree extractors can't measure the text until they parse the page
+            if self.stop_early and self.received >= _early_stop_bytes:
+                self._stopped = True
+                self._partial_links = True
+                return True
+
+        if self.received >= _max_bytes:
+            logging.info(f"Stopped reading {self.url} at the {_max_bytes} byte cap")
+            self._stopped = True
+            return True
+        return False
+
+    def result(self):
+        """Extract the page read so far."""
+        if not self._stopped and self._decoder is not None:
+            tail = self._decoder.decode(b'', final=True)
+            if self._extractor is not None:
+                self._extractor.feed(tail)
+            else:
+                self._parts.append(tail)
+
+        if self._extractor is not None:
+            self._extractor.close()
+            page = self._extractor.result()
+        else:
+            page = _extractor(''.join(self._parts), self.url)
+        if self._partial_links:
+            page['partial_links'] = True
+        return page
+
+def _lookup_page(url, need_links=False):
+    """
+    Look up a page in the scrape cache
+
+    Pages read only as far as their main text are not reused when need_links
+    is set.
+
+    Returns:
+        tuple: (page, cached entry, request headers). page is set for fresh
+            entries; otherwise the headers carry the validators of any expired
+            entry so it can be revalidated.
+    """
+    cached = _page_cache.get(url, include_expired=True) if _page_cache else None
+    if cached and need_links and cached[0]['page'].get('partial_links'):
+        cached = None
+    if cached and cached[1] != 'expired':
+        _page_cache.record('hits')
+        return cached[0]['page'], cached, None
+
+    headers = dict(HEADERS)
+    if cached:
+        validators = cached[0]['validators']
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    return None, cached, headers
+
+def _store_page(url, cached, response, page):
+    """Reuse the cached parse on 304, otherwise cache the new one; returns the page."""
+    if page is None:
+        if not cached:
+            raise ScrapeError("Server answered 304 Not Modified to an unconditional request")
+        _page_cache.record('revalidated')
+        # Re-store to restart the entry's freshness window
+        _page_cache.set(url, cached[0])
+        return cached[0]['page']
+
+    if _page_cache:
+        _page_cache.record('misses')
+        _page_cache.set(url, {
+            'validators': {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            },
+            'status': response.status_code,
+            'content_type': response.headers.get('Content-Type'),
+            'page': page
+        })
+
+    return page
+
+def _get_page(url, timeout=15, need_links=False):
+    """
+    Fetch and parse a page through the scrape cache
+
+    Fresh entries are served without a request. Expired entries are
+    revalidated with If-None-Match/If-Modified-Since; on 304 the stored
+    parse is reused, so neither the download nor the parse is repeated.
+
+    Args:
+        need_links (bool): Read the whole page for its links, as crawls do
+
+    Returns:
+        dict: {'text': main content text, 'links': crawlable links}
+    """
+    page, cached, headers = _lookup_page(url, need_links)
+    if page is not None:
+        return page
+
+    response, page = _fetch_page(url, timeout=timeout, headers=headers, need_links=need_links)
+    return _store_page(url, cached, response, page)
+
+async def _get_page_async(url, timeout=15, need_links=False):
+    """Async version of _get_page(), sharing its cache entries."""
+    page, cached, headers = _lookup_page(url, need_links)
+    if page is not None:
+        return page
+
+    response, page = await _fetch_page_async(url, timeout=timeout, headers=headers, need_links=need_links)
+    return _store_page(url, cached, response, page)
+
+def _clean_text(text):
+    """Collapse runs of whitespace."""
+    return re.sub(r'\s+', ' ', text).strip()
+
 def scrape_website(url):
     """Scrape website content using BeautifulSoup."""
     try:
         # Validate URL format
         if not validate_url(url):
             return f"Error scraping website: Invalid URL format. Please include http:// or https://"
-        
-        # Set headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        # Make the request with a timeout
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # Check content type
-        content_type = response.headers.get('Content-Type', '').lower()
-        if 'text/html' not in content_type:
-            return f"Error scraping website: Not an HTML page (Content-Type: {content_type})"
-        
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script, style, nav, footer, header elements
-        for element in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
-            element.extract()
-            
-        # Get the main content - prefer articles or main elements if they exist
-        main_content = None
-        
-        # Try to find main content containers
-        for container in ['article', 'main', '.content', '#content', '.main', '#main']:
-            if container.startswith('.') or container.startswith('#'):
-                selector = container
-            else:
-                selector = container
-            
-            elements = soup.select(selector)
-            if elements:
-                main_content = ' '.join([elem.get_text(separator=' ', strip=True) for elem in elements])
-                break
-        
-        # If no specific content container found, use the body
-        if not main_content:
-            main_content = soup.body.get_text(separator=' ', strip=True) if soup.body else ''
-        
-        # If still empty, use the entire document
-        if not main_content:
-            main_content = soup.get_text(separator=' ', strip=True)
-            
+
+        # Fetch and parse, reusing a cached parse when possible
+        page = _get_page(url)
+
         # Clean up text (remove extra whitespace)
-        clean_text = re.sub(r'\s+', ' ', main_content).strip()
-        
+        clean_text = _clean_text(page['text'])
+
         # Check if we got meaningful content
         if len(clean_text) < 100:
             return f"Error scraping website: Insufficient content retrieved (only {len(clean_text)} characters)"
-        
+
         return clean_text
-    
+
     except requests.exceptions.RequestException as e:
         return f"Error scraping website: Request failed - {str(e)}"
     except Exception as e:
         return f"Error scraping website: {str(e)}"
+
+async def scrape_website_async(url):
+    """Async version of scrape_website(), for the asyncio workflow."""
+    try:
+        if not validate_url(url):
+            return f"Error scraping website: Invalid URL format. Please include http:// or https://"
+
+        page = await _get_page_async(url)
+        clean_text = _clean_text(page['text'])
+
+        if len(clean_text) < 100:
+            return f"Error scraping website: Insufficient content retrieved (only {len(clean_text)} characters)"
+
+        return clean_text
+
+    except httpx.HTTPError as e:
+        return f"Error scraping website: Request failed - {str(e)}"
+    except Exception as e:
+        return f"Error scraping website: {str(e)}"
+
+def _same_site(netloc, other):
+    """Treat www.example.com and example.com as the same site."""
+    return netloc.lower().removeprefix('www.') == other.lower().removeprefix('www.')
+
+def _read_text(url, max_bytes, timeout=10):
+    """
+    GET a text resource such as robots.txt or a sitemap, reading at most max_bytes of it
+
+    Returns:
+        tuple: (status code, text); the text is empty unless the status is 200
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails
+    """
+    with http_get(url, headers=HEADERS, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, ''
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=16384):
+            body.extend(chunk)
+            if len(body) >= max_bytes:
+                logging.info(f"Stopped reading {url} at the {max_bytes} byte cap")
+                break
+        return 200, bytes(body[:max_bytes]).decode(response.encoding or 'utf-8', errors='replace')
+
+def _load_robots(root_url, timeout=10):
+    """
+    Fetch and parse robots.txt, as RobotFileParser.read() would
+
+    A 401 or 403 disallows everything; any other error, or an unreachable
+    file, allows everything.
+    """
+    robots = RobotFileParser()
+    try:
+        status, text = _read_text(urljoin(root_url, '/robots.txt'), ROBOTS_MAX_BYTES, timeout=timeout)
+    except requests.exceptions.RequestException:
+        status, text = None, ''
+    if status in (401, 403):
+        robots.disallow_all = True
+    else:
+        robots.parse(text.splitlines())
+    return robots
+
+def _sitemap_urls(root_url, robots, limit, timeout=10):
+    """Collect page URLs from the site's sitemaps, following one level of sitemap indexes."""
+    sitemaps = list(robots.site_maps() or []) or [urljoin(root_url, '/sitemap.xml')]
+    urls = []
+
+    for depth in range(2):
+        nested = []
+        for sitemap in sitemaps:
+            try:
+                status, text = _read_text(sitemap, _max_bytes, timeout=timeout)
+                if status != 200:
+                    continue
+            except requests.exceptions.RequestException:
+                continue
+
+            # A sitemap cut off at the byte cap still yields the URLs read so far
+            locs = re.findall(r'<loc>\s*(.*?)\s*</loc>', text, re.IGNORECASE)
+            if '<sitemapindex' in text:
+                nested.extend(locs)
+            else:
+                urls.extend(locs)
+
+            if len(urls) >= limit:
+                return urls[:limit]
+        sitemaps = nested
+
+    return urls[:limit]
+
+def crawl_website(url, max_pages=10, max_depth=2, max_chars=20000, concurrency=4, rate_limit=4,
+                  use_sitemap=True):
+    """
+    Crawl a site for brand research, starting from the given URL
+
+    Follows same-site links breadth-first (seeded from the sitemap when
+    available), honours robots.txt and fetches each level concurrently with
+    a per-host rate limit. Text blocks repeated across pages (menus, calls to
+    action) are kept once. Crawling stops when max_chars of text is collected.
+
+    Args:
+        url (str): Start page
+        max_pages (int): Maximum pages to fetch
+        max_depth (int): Maximum link depth from the start page
+        max_chars (int): Stop once this much text is collected
+        concurrency (int): Maximum concurrent page fetches
+        rate_limit (float): Maximum requests per second to the site
+        use_sitemap (bool): Seed the crawl from sitemap.xml
+
+    Returns:
+        str: The combined page text, or an error message starting with "Error"
+    """
+    if not validate_url(url):
+        return f"Error scraping website: Invalid URL format. Please include http:// or https://"
+
+    site = urlparse(url).netloc
+    robots = _load_robots(url)
+    limiter = HostRateLimiter(rate_limit)
+
+    def allowed(page_url):
+        return _same_site(urlparse(page_url).netloc, site) and robots.can_fetch(HEADERS['User-Agent'], page_url)
+
+    def fetch(page_url):
+        """Return (text blocks, links) for a page, or an exception."""
+        try:
+            limiter.wait(page_url)
+            page = _get_page(page_url, need_links=True)
+            return page['text'].split('\n'), page['links']
+        except Exception as e:
+            return e
+
+    # The start page was submitted by the user; beyond it, robots.txt decides
+    seen = {url}
+    level = [url]
+    if use_sitemap and not robots.disallow_all:
+        for page_url in _sitemap_urls(url, robots, max_pages):
+            page_url = normalize_link(url, page_url)
+            if page_url and page_url not in seen and allowed(page_url):
+                seen.add(page_url)
+                level.append(page_url)
+    level = level[:max_pages]
+
+    seen_blocks = set()
+    collected = []
+    total_chars = 0
+    pages_fetched = 0
+    first_error = None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for depth in range(max_depth + 1):
+            if not level or total_chars >= max_chars:
+                break
+
+            next_level = []
+            futures = [(page_url, pool.submit(fetch, page_url)) for page_url in level]
+            for index, (page_url, future) in enumerate(futures):
+                if total_chars >= max_chars:
+                    # Enough text collected; drop pages that have not started yet
+                    for _, pending in futures[index:]:
+                        pending.cancel()
+                    break
+
+                outcome = future.result()
+                pages_fetched += 1
+                if isinstance(outcome, Exception):
+                    if page_url == url:
+                        first_error = outcome
+                    continue
+
+                blocks, links = outcome
+                for block in blocks:
+                    block = _clean_text(block)
+                    digest = hashlib.sha1(block.lower().encode('utf-8')).hexdigest()
+                    if block and digest not in seen_blocks:
+                        seen_blocks.add(digest)
+                        collected.append(block)
+                        total_chars += len(block) + 1
+
+                for link in links:
+                    if link not in seen and allowed(link):
+                        seen.add(link)
+                        next_level.append(link)
+
+            level = next_level[:max(0, max_pages - pages_fetched)]
+
+    clean_text = _clean_text(' '.join(collected))[:max_chars]
+
+    if len(clean_text) < 100:
+        if isinstance(first_error, requests.exceptions.RequestException):
+            return f"Error scraping website: Request failed - {str(first_error)}"
+        if first_error is not None:
+            return f"Error scraping website: {str(first_error)}"
+        return f"Error scraping website: Insufficient content retrieved (only {len(clean_text)} characters)"
+
+    return clean_text
@@ -1,7 +1,149 @@
 import requests
 import os
 import json
-from flask import current_app
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from utils.ratelimit import HostRateLimiter
+from utils.http_session import http_get, http_get_async
+from utils.cache import create_cache
+
+SERPAPI_URL = "https://serpapi.com/search"
+
+# Shared limiter so concurrent batches respect the same per-host rate; its
+# rate is set once by configure_search_cache()
+_rate_limiter = HostRateLimiter()
+
+# SERP result cache, set up by configure_search_cache()
+_search_cache = None
+
+def configure_search_cache(config):
+    """
+    Set up the SERP result cache and the shared SerpAPI rate limit from app config
+    
+    Args:
+        config (dict): Flask app config
+    """
+    global _search_cache
+    _rate_limiter.rate = config.get('SERPAPI_RATE_LIMIT')
+    _search_cache = create_cache(
+        'serp',
+        backend=config.get('SERP_CACHE_BACKEND', 'memory'),
+        ttl=config.get('SERP_CACHE_TTL', 86400),
+        stale_ttl=config.get('SERP_CACHE_STALE_TTL', 0),
+        max_entries=config.get('SERP_CACHE_MAX_ENTRIES', 5000),
+        sqlite_path=config.get('CACHE_SQLITE_PATH'),
+        redis_url=config.get('REDIS_URL')
+    )
+
+def _cache_key(query, engine, num_results):
+    """Build the cache key from the normalized query, engine and result count."""
+    normalized = ' '.join(query.lower().split())
+    return f"{engine}:{num_results}:{normalized}"
+
+def _get_api_key(api_key=None):
+    """Resolve the SerpAPI key from the argument, app config, or environment."""
+    if api_key:
+        return api_key
+    if has_app_context():
+        api_key = current_app.config.get('SERPAPI_API_KEY')
+    return api_key or os.environ.get('SERPAPI_API_KEY')
+
+def _get_setting(name, default):
+    """Read a setting from the app config when available."""
+    if has_app_context():
+        value = current_app.config.get(name)
+        if value is not None:
+            return value
+    return default
+
+def _request_serpapi(query, api_key, num_results=5, engine="google", limiter=None):
+    """
+    Send a single SerpAPI query, raising on any failure
+
+    Args:
+        query (str): Search query
+        api_key (str): SerpAPI API key
+        num_results (int): Number of results to return
+        engine (str): SerpAPI search engine
+        limiter (HostRateLimiter): Rate limiter to use instead of the shared one
+
+    Returns:
+        list: List of search result dictionaries
+    """
+    if not api_key:
+        raise ValueError("SerpAPI key not found in environment or app config")
+    
+    # Make the request
+    (limiter or _rate_limiter).wait(SERPAPI_URL)
+    response = http_get(SERPAPI_URL, params=_serpapi_params(query, api_key, num_results, engine), timeout=15)
+    response.raise_for_status()
+    
+    return _parse_results(response.json())
+
+async def _request_serpapi_async(query, api_key, num_results=5, engine="google", limiter=None):
+    """Async version of _request_serpapi(), raising on any failure."""
+    if not api_key:
+        raise ValueError("SerpAPI key not found in environment or app config")
+    
+    delay = (limiter or _rate_limiter).reserve(SERPAPI_URL)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    response = await http_get_async(SERPAPI_URL, params=_serpapi_params(query, api_key, num_results, engine),
+                                    timeout=15)
+    response.raise_for_status()
+    
+    return _parse_results(response.json())
+
+def _serpapi_params(query, api_key, num_results, engine):
+    """Build SerpAPI request parameters."""
+    return {
+        "q": query,
+        "api_key": api_key,
+        "engine": engine,
+        "num": num_results
+    }
+
+def _parse_results(data):
+    """Extract and format organic results from a SerpAPI response."""
+    results = []
+    if "organic_results" in data:
+        for result in data["organic_results"]:
+            entry = {
+                "title": result.get("title", ""),
+                "link": result.get("link", ""),
+                "snippet": result.get("snippet", ""),
+                "position": result.get("position", 0)
+            }
+            results.append(entry)
+    
+    return results
+
+def _fetch_serpapi(query, api_key, num_results=5, engine="google", limiter=None):
+    """
+    Run a single SerpAPI query through the result cache, raising on any failure
+    
+    Empty result sets and errors are never cached.
+    """
+    if _search_cache is None:
+        return _request_serpapi(query, api_key, num_results, engine, limiter)
+    
+    return _search_cache.get_or_compute(
+        _cache_key(query, engine, num_results),
+        lambda: _request_serpapi(query, api_key, num_results, engine, limiter),
+        should_store=bool
+    )
+
+async def _fetch_serpapi_async(query, api_key, num_results=5, engine="google", limiter=None):
+    """Async version of _fetch_serpapi()."""
+    if _search_cache is None:
+        return await _request_serpapi_async(query, api_key, num_results, engine, limiter)
+    
+    return await _search_cache.get_or_compute_async(
+        _cache_key(query, engine, num_results),
+        lambda: _request_serpapi_async(query, api_key, num_results, engine, limiter),
+        should_store=bool
+    )
 
 def search_serpapi(query, api_key=None, num_results=5):
     """
@@ -16,40 +158,7 @@ def search_serpapi(query, api_key=None, num_results=5):
         list: List of search result dictionaries
     """
     try:
-        # Get API key from parameter, app config, or environment
-        if not api_key:
-            api_key = current_app.config.get('SERPAPI_API_KEY') or os.environ.get('SERPAPI_API_KEY')
-        
-        if not api_key:
-            raise ValueError("SerpAPI key not found in environment or app config")
-        
-        # Set up request parameters
-        base_url = "https://serpapi.com/search"
-        params = {
-            "q": query,
-            "api_key": api_key,
-            "engine": "google",
-            "num": num_results
-        }
-        
-        # Make the request
-        response = requests.get(base_url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract and format results
-        results = []
-        if "organic_results" in data:
-            for result in data["organic_results"]:
-                entry = {
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""),
-                    "snippet": result.get("snippet", ""),
-                    "position": result.get("position", 0)
-                }
-                results.append(entry)
-        
-        return results
+        return _fetch_serpapi(query, _get_api_key(api_key), num_results)
     
     except requests.exceptions.RequestException as e:
         print(f"Error with SerpAPI request: {str(e)}")
@@ -61,6 +170,98 @@ def search_serpapi(query, api_key=None, num_results=5):
         print(f"Unexpected error with SerpAPI: {str(e)}")
         return []
 
+def search_many(keywords, api_key=None, num_results=5, max_workers=None, rate_limit=None):
+    """
+    Search several keywords concurrently with SerpAPI
+    
+    Queries run on a bounded thread pool and are spaced out per host by the
+    shared rate limiter. A failure for one keyword does not affect the others.
+    
+    Args:
+        keywords (list): Search queries
+        api_key (str): SerpAPI API key (optional, will use from config if not provided)
+        num_results (int): Number of results to return per keyword
+        max_workers (int): Maximum concurrent queries (defaults to SEARCH_CONCURRENCY)
+        rate_limit (float): Maximum requests per second per host for this call only;
+            by default queries share the SERPAPI_RATE_LIMIT limiter with other jobs
+    
+    Returns:
+        tuple: (deduplicated results in keyword order, dict of keyword -> error message)
+    """
+    keywords = [k for k in keywords if k]
+    if not keywords:
+        return [], {}
+    
+    # Resolve settings in the calling thread, where the app context lives
+    api_key = _get_api_key(api_key)
+    if max_workers is None:
+        max_workers = _get_setting('SEARCH_CONCURRENCY', 5)
+    limiter = None if rate_limit is None else HostRateLimiter(rate_limit)
+    
+    def run(keyword):
+        try:
+            return _fetch_serpapi(keyword, api_key, num_results, limiter=limiter), None
+        except Exception as e:
+            return [], str(e)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keywords)))) as pool:
+        outcomes = list(pool.map(run, keywords))
+    
+    return _collect_outcomes(keywords, outcomes)
+
+async def search_many_async(keywords, api_key=None, num_results=5, concurrency=None, rate_limit=None):
+    """
+    Search several keywords concurrently with SerpAPI, from an event loop
+    
+    Same results and failure reporting as search_many(), with queries run as
+    coroutines bounded by a semaphore instead of on a thread pool.
+    
+    Args:
+        keywords (list): Search queries
+        api_key (str): SerpAPI API key (optional, will use from config if not provided)
+        num_results (int): Number of results to return per keyword
+        concurrency (int): Maximum concurrent queries (defaults to SEARCH_CONCURRENCY)
+        rate_limit (float): Maximum requests per second per host for this call only;
+            by default queries share the SERPAPI_RATE_LIMIT limiter with other jobs
+    
+    Returns:
+        tuple: (deduplicated results in keyword order, dict of keyword -> error message)
+    """
+    keywords = [k for k in keywords if k]
+    if not keywords:
+        return [], {}
+    
+    api_key = _get_api_key(api_key)
+    if concurrency is None:
+        concurrency = _get_setting('SEARCH_CONCURRENCY', 5)
+    limiter = None if rate_limit is None else HostRateLimiter(rate_limit)
+    
+    slots = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run(keyword):
+        async with slots:
+            try:
+                return await _fetch_serpapi_async(keyword, api_key, num_results, limiter=limiter), None
+            except Exception as e:
+                return [], str(e)
+    
+    outcomes = await asyncio.gather(*(run(keyword) for keyword in keywords))
+    return _collect_outcomes(keywords, outcomes)
+
+def _collect_outcomes(keywords, outcomes):
+    """Merge per-keyword (results, error) outcomes into deduplicated results and failures."""
+    all_results = []
+    failures = {}
+    for keyword, (results, error) in zip(keywords, outcomes):
+        if error:
+            failures[keyword] = error
+        elif not results:
+            failures[keyword] = "No results found"
+        else:
+            all_results.extend(results)
+    
+    return deduplicate_results(all_results), failures
+
 def deduplicate_results(results):
     """
     Deduplicate search results by URL
@@ -0,0 +1,84 @@
+import time
+import threading
+
+class BranchCancelled(Exception):
+    """Raised from a speculative branch's stream callback to stop generating."""
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text or '') / 4
+
+class SpeculationBudget:
+    """
+    Token budget shared by the branches of one speculative run
+
+    Both prompt and generated tokens are charged, as estimated by
+    estimate_tokens(). Safe to use from several threads.
+
+    Args:
+        max_tokens (int): Estimated tokens the run may spend in total
+    """
+
+    def __init__(self, max_tokens):
+        self.max_tokens = max_tokens
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Charge tokens to the budget; returns False, charging nothing, if they do not fit."""
+        with self._lock:
+            if self.spent + tokens > self.max_tokens:
+                return False
+            self.spent += tokens
+            return True
+
+class Branch:
+    """
+    One speculative agent call: its cancellation flag and a budget-checked
+    on_delta callback
+
+    Pass the branch as `on_delta` to run_agent_with_openai(). Once it is
+    cancelled, the budget runs out, or still_wanted() says the result is no
+    longer needed, the next delta raises BranchCancelled, which aborts the
+    stream so no further tokens are paid for.
+
+    Args:
+        key: Identifies the branch, e.g. the theme number
+        budget (SpeculationBudget): Budget shared with the other branches
+        still_wanted (callable): Optional check, called at most every
+            check_interval seconds while streaming, that returns False once
+            the branch's result would be thrown away
+        check_interval (float): Seconds between still_wanted checks
+    """
+
+    def __init__(self, key, budget, still_wanted=None, check_interval=1.0):
+        self.key = key
+        self.budget = budget
+        self.check_interval = check_interval
+        self._still_wanted = still_wanted
+        self._next_check = 0.0
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def still_wanted(self):
+        """Run the still_wanted check now, cancelling the branch if it fails."""
+        if not self.cancelled and self._still_wanted is not None and not self._still_wanted():
+            self.cancel()
+        return not self.cancelled
+
+    def __call__(self, delta):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.still_wanted()
+        if self.cancelled:
+            raise BranchCancelled(f"Branch {self.key} cancelled")
+        if not self.budget.reserve(estimate_tokens(delta)):
+            self.cancel()
+            raise BranchCancelled(f"Branch {self.key} exceeded the speculation budget")
@@ -32,7 +32,7 @@ class WorkflowManager:
             "INITIALIZATION": datetime.now().isoformat()
         }
         
-        # Debug information
+        # Transitions not yet written to the job's event log (see pop_transitions)
         self.transition_history = []
     
     def advance_phase(self):
@@ -98,6 +98,12 @@ class WorkflowManager:
             
             return self.selected_theme
     
+    def pop_transitions(self):
+        """Return the transitions recorded since the last call and clear them"""
+        transitions = self.transition_history
+        self.transition_history = []
+        return transitions
+    
     def save_state(self):
         """Serialize the workflow state to a dictionary"""
         return {
@@ -106,8 +112,7 @@ class WorkflowManager:
             "waiting_for_user_input": self.waiting_for_user_input,
             "selected_theme": self.selected_theme,
             "completed_phases": list(self.completed_phases),
-            "phase_timestamps": self.phase_timestamps,
-            "transition_history": self.transition_history
+            "phase_timestamps": self.phase_timestamps
         }
     
     def load_state(self, state_dict):
@@ -121,7 +126,8 @@ class WorkflowManager:
         self.selected_theme = state_dict.get("selected_theme")
         self.completed_phases = set(state_dict.get("completed_phases", []))
         self.phase_timestamps = state_dict.get("phase_timestamps", {})
-        self.transition_history = state_dict.get("transition_history", [])
+        # Past transitions live in the job's event log, not in the saved state
+        self.transition_history = []
     
     def visualize_progress(self):
         """Generate a visual representation of workflow progress"""
@@ -0,0 +1,57 @@
+"""job progress columns and artifacts table
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Progress fields read on every status poll
+    op.add_column('jobs', sa.Column('current_phase', sa.String(30), nullable=True))
+    op.add_column('jobs', sa.Column('progress', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('messages', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('completed_at', sa.DateTime(), nullable=True))
+
+    # Small results shown directly by the processing and results pages
+    op.add_column('jobs', sa.Column('content_themes', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('selected_theme', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('website_content_length', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('search_results_count', sa.Integer(), nullable=True))
+
+    # Large phase outputs, loaded only when a page needs them
+    op.create_table('job_artifacts',
+        sa.Column('job_id', sa.String(36), nullable=False),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('content', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'name')
+    )
+
+    # Carry over what the old schema did persist
+    op.execute("UPDATE jobs SET current_phase = workflow_state->>'current_phase', progress = 0")
+    op.execute("UPDATE jobs SET progress = 100, completed_at = updated_at WHERE status = 'completed'")
+
+
+def downgrade() -> None:
+    op.drop_table('job_artifacts')
+    op.drop_column('jobs', 'search_results_count')
+    op.drop_column('jobs', 'website_content_length')
+    op.drop_column('jobs', 'selected_theme')
+    op.drop_column('jobs', 'content_themes')
+    op.drop_column('jobs', 'completed_at')
+    op.drop_column('jobs', 'messages')
+    op.drop_column('jobs', 'progress')
+    op.drop_column('jobs', 'current_phase')
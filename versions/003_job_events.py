@@ -0,0 +1,66 @@
+"""append-only job event log
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The (job_id, seq) primary key doubles as the cursor index for status polls
+    op.create_table('job_events',
+        sa.Column('job_id', sa.String(36), nullable=False),
+        sa.Column('seq', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('data', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'seq')
+    )
+    op.add_column('jobs', sa.Column('event_seq', sa.Integer(), nullable=True))
+
+    # Move messages and transition history out of the job row
+    op.execute("""
+        INSERT INTO job_events (job_id, seq, kind, message, created_at)
+        SELECT jobs.id, m.seq, 'message', m.message, jobs.updated_at
+        FROM jobs, json_array_elements_text(jobs.messages) WITH ORDINALITY AS m(message, seq)
+        WHERE jobs.messages IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO job_events (job_id, seq, kind, data, created_at)
+        SELECT jobs.id, COALESCE(json_array_length(jobs.messages), 0) + t.seq, 'transition', t.transition,
+               (t.transition->>'timestamp')::timestamp
+        FROM jobs, json_array_elements(jobs.workflow_state->'transition_history') WITH ORDINALITY AS t(transition, seq)
+        WHERE json_typeof(jobs.workflow_state->'transition_history') = 'array'
+    """)
+    op.execute("""
+        UPDATE jobs SET event_seq = COALESCE(
+            (SELECT MAX(seq) FROM job_events WHERE job_events.job_id = jobs.id), 0)
+    """)
+    op.execute("""
+        UPDATE jobs SET workflow_state = (workflow_state::jsonb - 'transition_history')::json
+        WHERE workflow_state IS NOT NULL
+    """)
+    op.drop_column('jobs', 'messages')
+
+
+def downgrade() -> None:
+    op.add_column('jobs', sa.Column('messages', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.execute("""
+        UPDATE jobs SET messages = (
+            SELECT json_agg(message ORDER BY seq) FROM job_events
+            WHERE job_events.job_id = jobs.id AND kind = 'message')
+    """)
+    op.drop_column('jobs', 'event_seq')
+    op.drop_table('job_events')
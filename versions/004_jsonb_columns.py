@@ -0,0 +1,56 @@
+"""store JSON columns as JSONB with GIN indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = [
+    ('jobs', 'results'),
+    ('jobs', 'workflow_state'),
+    ('jobs', 'content_themes'),
+    ('jobs', 'selected_theme'),
+    ('job_artifacts', 'content'),
+    ('job_events', 'data'),
+]
+
+GIN_INDEXES = [
+    ('ix_jobs_workflow_state', 'workflow_state'),
+    ('ix_jobs_selected_theme', 'selected_theme'),
+    ('ix_jobs_content_themes', 'content_themes'),
+]
+
+
+def upgrade() -> None:
+    for table, column in JSON_COLUMNS:
+        op.alter_column(table, column,
+                        type_=postgresql.JSONB(astext_type=sa.Text()),
+                        existing_type=postgresql.JSON(astext_type=sa.Text()),
+                        postgresql_using=f'{column}::jsonb')
+
+    for name, column in GIN_INDEXES:
+        op.create_index(name, 'jobs', [column], postgresql_using='gin',
+                        postgresql_ops={column: 'jsonb_path_ops'})
+    op.create_index('ix_jobs_current_phase', 'jobs', ['current_phase'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_current_phase', table_name='jobs')
+    for name, _ in GIN_INDEXES:
+        op.drop_index(name, table_name='jobs')
+
+    for table, column in JSON_COLUMNS:
+        op.alter_column(table, column,
+                        type_=postgresql.JSON(astext_type=sa.Text()),
+                        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                        postgresql_using=f'{column}::json')
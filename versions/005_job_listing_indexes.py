@@ -0,0 +1,42 @@
+"""job website domain and listing indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Composite indexes for keyset pagination of the job listing (newest first)
+LISTING_INDEXES = [
+    ('ix_jobs_created_at_id', ['created_at', 'id']),
+    ('ix_jobs_status_created_at_id', ['status', 'created_at', 'id']),
+    ('ix_jobs_website_domain_created_at_id', ['website_domain', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('website_domain', sa.String(255), nullable=True))
+
+    # Same normalization as models.normalize_domain: lower-cased host without 'www.'
+    op.execute(r"""
+        UPDATE jobs SET website_domain = regexp_replace(
+            substring(lower(website_url) from '^[a-z][a-z0-9+.-]*://(?:[^@/]*@)?([^/:?#]+)'),
+            '^www\.', '')
+    """)
+
+    for name, columns in LISTING_INDEXES:
+        op.create_index(name, 'jobs', columns)
+
+
+def downgrade() -> None:
+    for name, _ in LISTING_INDEXES:
+        op.drop_index(name, table_name='jobs')
+    op.drop_column('jobs', 'website_domain')
@@ -0,0 +1,27 @@
+"""job submission fingerprint
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing jobs keep a NULL fingerprint: they are never reused, and fall
+    # outside the deduplication window soon enough.
+    op.add_column('jobs', sa.Column('fingerprint', sa.String(64), nullable=True))
+    op.create_index('ix_jobs_fingerprint_created_at', 'jobs', ['fingerprint', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_fingerprint_created_at', table_name='jobs')
+    op.drop_column('jobs', 'fingerprint')
@@ -0,0 +1,36 @@
+"""drop job indexes no query uses
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# Created by 004 for ad-hoc containment and phase queries that nothing runs;
+# the JSONB columns are rewritten on most job updates, so the GIN indexes
+# only add write cost
+GIN_INDEXES = [
+    ('ix_jobs_workflow_state', 'workflow_state'),
+    ('ix_jobs_selected_theme', 'selected_theme'),
+    ('ix_jobs_content_themes', 'content_themes'),
+]
+
+
+def upgrade() -> None:
+    op.drop_index('ix_jobs_current_phase', table_name='jobs')
+    for name, _ in GIN_INDEXES:
+        op.drop_index(name, table_name='jobs')
+
+
+def downgrade() -> None:
+    for name, column in GIN_INDEXES:
+        op.create_index(name, 'jobs', [column], postgresql_using='gin',
+                        postgresql_ops={column: 'jsonb_path_ops'})
+    op.create_index('ix_jobs_current_phase', 'jobs', ['current_phase'])
@@ -0,0 +1,25 @@
+"""
+Celery worker entry point.
+
+Run with JOB_EXECUTOR=celery:
+
+    celery -A worker.celery worker --concurrency=4
+
+The worker pool scales independently of the web processes; concurrency
+defaults to JOB_WORKER_CONCURRENCY.
+
+With JOB_ASYNC_WORKFLOW=true, tasks run the asyncio workflow on one shared
+event loop per worker process, so use the threads pool and a high
+concurrency to keep dozens of jobs in flight per process:
+
+    celery -A worker.celery worker --pool=threads --concurrency=50
+
+Jobs in flight on the loop are capped at JOB_ASYNC_CONCURRENCY, which may
+not exceed the database pool; raise DB_POOL_SIZE/DB_MAX_OVERFLOW with it.
+"""
+from app import app, executor
+
+celery = executor.celery
+
+if celery is None:
+    raise RuntimeError("JOB_EXECUTOR must be set to 'celery' to run a Celery worker")